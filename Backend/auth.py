@@ -2,11 +2,17 @@ from datetime import datetime, timedelta
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
 from models import User, Login
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from extensions import SessionLocal
-from sqlalchemy.orm import Session
+from extensions import get_db
+from cache import TTLCache
+from metrics import AUTH_DURATION
+from config import AUTH_CACHE_SIZE, AUTH_CACHE_TTL, BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS
+from concurrent.futures import ThreadPoolExecutor
+import asyncio, time
 import pytz
 
 # Sample secret key and algo
@@ -16,17 +22,31 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/user/login")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-db = SessionLocal()
+# Hashes made with a different cost are flagged by verify_and_update and rehashed on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt is CPU-bound; a dedicated bounded pool keeps it off the event loop
+# and stops a login spike from occupying every threadpool thread
+hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+# Resolved principals keyed by token subject, so hot users only cost a JWT decode
+user_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
 
 ist = pytz.timezone("Asia/Kolkata")
 
 def verify_password(plain, hashed):
     return pwd_context.verify(plain, hashed)
 
-def authenticate_user(username: str, password: str, db: Session):
-    user = get_user(username, db)
-    if not user or not verify_password(password, user['password']):
+async def hash_password_async(plain: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(hash_pool, pwd_context.hash, plain)
+
+async def verify_and_update_async(plain: str, hashed: str):
+    """Returns (verified, new_hash); new_hash is set when the stored hash should be upgraded."""
+    return await asyncio.get_running_loop().run_in_executor(hash_pool, pwd_context.verify_and_update, plain, hashed)
+
+async def authenticate_user(username: str, password: str, db: AsyncSession):
+    user = await get_user(username, db)
+    if not user or not (await verify_and_update_async(password, user['password']))[0]:
         return False
     return user
 
@@ -36,7 +56,11 @@ def create_access_token(data: dict, expires_delta=None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+def invalidate_user(username: str):
+    """Drop a cached principal after its login, role or user row changes."""
+    user_cache.invalidate(username)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid authentication",
@@ -47,9 +71,16 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         username = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=401, detail="Invalid token: no subject")
-        user = get_user(username, SessionLocal())
+        start = time.perf_counter()
+        user = user_cache.get(username)
+        if user is not None:
+            AUTH_DURATION.observe(time.perf_counter() - start, "hit")
+            return user
+        user = await get_user(username, db)
+        AUTH_DURATION.observe(time.perf_counter() - start, "miss")
         if not user:
             raise credentials_exception
+        user_cache.set(username, user)
         return user
     except JWTError:
         raise credentials_exception
@@ -61,6 +92,13 @@ def require_role(role: str):
         return user
     return role_checker
 
-def get_user(username: str, db: Session):
-    user = db.query(Login).filter(Login.username == username).first()
+async def get_login(username: str, db: AsyncSession):
+    return await db.scalar(
+        select(Login)
+        .options(joinedload(Login.role), joinedload(Login.user))
+        .where(Login.username == username)
+    )
+
+async def get_user(username: str, db: AsyncSession):
+    user = await get_login(username, db)
     return user.to_dict(True) if user else None
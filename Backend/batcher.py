@@ -0,0 +1,104 @@
+import asyncio
+from fastapi.concurrency import run_in_threadpool
+
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent requests for up to `max_wait_ms`
+    (or until `max_batch_size` items are queued), runs `batch_fn` once on the
+    whole list in the threadpool (or awaits it, if it's a coroutine function),
+    and hands each caller its own result.
+
+    `batch_fn` must take a list and return a list of results in the same order.
+    Up to `max_concurrent_batches` batches run at once (e.g. one per worker process);
+    with one, batches run in submission order.
+    """
+
+    def __init__(self, batch_fn, max_batch_size: int = 16, max_wait_ms: float = 5, max_concurrent_batches: int = 1):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self._queue = None
+        self._slots = None
+        self._worker = None
+        self._loop = None
+        self._pending = set()
+        self._batches = set()  # running batch tasks; the loop only keeps weak references
+
+    @property
+    def queue_depth(self) -> int:
+        """Items waiting to join a batch."""
+        return self._queue.qsize() if self._queue else 0
+
+    async def submit(self, item):
+        return await self.submit_nowait(item)
+
+    def submit_nowait(self, item) -> asyncio.Future:
+        """Queue `item` and return the future of its result without waiting for it."""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        self._queue.put_nowait((item, future))
+        return future
+
+    async def drain(self):
+        """Wait until every item submitted so far has been processed (e.g. on shutdown)."""
+        if self._pending:
+            await asyncio.wait(list(self._pending))
+
+    def _ensure_worker(self):
+        # The worker is bound to the running loop, so (re)start it lazily
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = loop.create_task(self._run())
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Only start collecting once a slot is free, so queued items join the next batch
+            await self._slots.acquire()
+            batch = await self._collect()
+            task = loop.create_task(self._execute(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _execute(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            if asyncio.iscoroutinefunction(self.batch_fn):
+                results = await self.batch_fn(items)
+            else:
+                results = await run_in_threadpool(self.batch_fn, items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), result in zip(batch, results):
+                if not future.done():  # caller may have been cancelled
+                    future.set_result(result)
+        finally:
+            self._slots.release()
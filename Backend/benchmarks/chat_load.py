@@ -0,0 +1,84 @@
+"""
+Concurrency load test for POST /chat/.
+
+Gemini and the emotion model are replaced with sleep-based stand-ins so the
+run is offline and only measures how well the handler overlaps slow turns.
+
+    python benchmarks/chat_load.py --users 1 4 16 --messages 5 --llm-latency 0.5
+"""
+import argparse, asyncio, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx
+import main
+import routes.chat as chat
+
+
+def install_stand_ins(llm_latency: float, emotion_latency: float):
+    def fake_generate_reply(prompt: str) -> str:
+        time.sleep(llm_latency)
+        return "I hear you. Tell me more about how that feels."
+
+    async def fake_detect_emotion(text: str) -> str:
+        await asyncio.sleep(emotion_latency)
+        return "neutral"
+
+    chat.generate_reply = fake_generate_reply
+    chat.detect_emotion_async = fake_detect_emotion
+
+
+async def run_user(client: httpx.AsyncClient, headers: dict, messages: int, latencies: list):
+    session_id = None
+    for i in range(messages):
+        start = time.perf_counter()
+        r = await client.post("/chat/", json={"user_message": f"I feel tired today ({i})", "session_id": session_id}, headers=headers)
+        r.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        session_id = r.json()["session_id"]
+
+
+async def run(users: int, messages: int) -> dict:
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        r = await client.post("/api/v1/user/login", data={"username": "admin@mindcare.com", "password": "admin123"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        latencies = []
+        start = time.perf_counter()
+        await asyncio.gather(*(run_user(client, headers, messages, latencies) for _ in range(users)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "users": users,
+        "requests": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--emotion-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    install_stand_ins(args.llm_latency, args.emotion_latency)
+
+    async def run_all():
+        try:
+            for users in args.users:
+                print(await run(users, args.messages))
+        finally:  # ASGITransport skips the app's lifespan, which would flush writes and close the pool
+            from extensions import async_engine
+            from persister import turn_writer
+            await turn_writer.drain()
+            await async_engine.dispose()
+
+    asyncio.run(run_all())
@@ -0,0 +1,52 @@
+"""
+Cold-start timing: starts uvicorn in a fresh process against a throwaway
+database and reports how long until /health answers (non-chat traffic is
+served) and until /ready returns 200 (chat path warm).
+
+    python benchmarks/cold_start.py --port 8765 --timeout 300
+"""
+import argparse, os, subprocess, sys, tempfile, time, urllib.error, urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def status(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as r:
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tempfile.mkdtemp()}/cold_start.db")
+    base = f"http://127.0.0.1:{args.port}"
+
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        serving = ready = None
+        while time.perf_counter() - start < args.timeout and ready is None:
+            if serving is None and status(f"{base}/health") == 200:
+                serving = time.perf_counter() - start
+            if serving is not None and status(f"{base}/ready") == 200:
+                ready = time.perf_counter() - start
+            time.sleep(0.05)
+
+        print({
+            "serving_s": round(serving, 2) if serving else None,
+            "chat_ready_s": round(ready, 2) if ready else None,
+        })
+    finally:
+        server.terminate()
+        server.wait()
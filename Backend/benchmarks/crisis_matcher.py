@@ -0,0 +1,58 @@
+"""
+Crisis phrase matching cost per message at 1x, 10x and 100x the current
+phrase count: the old per-pattern re.search loop vs. the PhraseMatcher.
+
+    python benchmarks/crisis_matcher.py --messages 2000
+"""
+import argparse, os, random, re, string, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phrase_matcher import PhraseMatcher
+from utils import CRISIS_PHRASES
+
+MESSAGES = [
+    "I have been feeling really tired lately and work is stressful, but I guess I can't complain too much",
+    "hi",
+    "My sister keeps asking about the wedding plans and I don't know what to tell her anymore",
+    "Honestly I feel like I can't go on like this",
+    "Thanks for listening, talking about my exam nerves helped",
+]
+
+
+def synthetic_phrases(count: int) -> list:
+    rng = random.Random(42)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8))) for _ in range(count * 2)]
+    return CRISIS_PHRASES + [" ".join(rng.sample(words, 3)) for _ in range(count - len(CRISIS_PHRASES))]
+
+
+def per_message_us(fn, messages) -> float:
+    start = time.perf_counter()
+    for text in messages:
+        fn(text)
+    return (time.perf_counter() - start) * 1e6 / len(messages)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+    messages = [MESSAGES[i % len(MESSAGES)] for i in range(args.messages)]
+
+    for factor in (1, 10, 100):
+        phrases = synthetic_phrases(len(CRISIS_PHRASES) * factor)
+
+        def loop(text):
+            t = text.lower()
+            return any(re.search(p, t) for p in phrases)
+
+        start = time.perf_counter()
+        matcher = PhraseMatcher(phrases)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        print({
+            "phrases": len(phrases),
+            "loop_us_per_msg": round(per_message_us(loop, messages), 1),
+            "matcher_us_per_msg": round(per_message_us(matcher.search, messages), 1),
+            "matcher_build_ms": round(build_ms, 1),
+        })
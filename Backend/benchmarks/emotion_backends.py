@@ -0,0 +1,90 @@
+"""
+Accuracy parity, latency and memory of the emotion model backends.
+
+Each backend is loaded in a fresh process so peak RSS is comparable. Labels
+are compared against the full-precision "pytorch" backend (agreement) and
+against the hand-labelled samples below (accuracy). Needs torch; the onnx
+backend also needs `pip install optimum[onnxruntime]`.
+
+    python benchmarks/emotion_backends.py --backends pytorch quantized onnx
+"""
+import argparse, multiprocessing, os, resource, sys, time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLES = [
+    ("I finally got the job, I can't stop smiling", "joy"),
+    ("Today was a really good day with my friends", "joy"),
+    ("Thank you, that made me feel so much better", "joy"),
+    ("I miss my grandmother so much since she passed", "sadness"),
+    ("I feel empty and nothing makes me happy anymore", "sadness"),
+    ("I cried all night after the breakup", "sadness"),
+    ("My roommate keeps eating my food and I'm furious", "anger"),
+    ("I hate how my boss talks down to me", "anger"),
+    ("Stop ignoring me, this is so unfair", "anger"),
+    ("I'm terrified about the exam results tomorrow", "fear"),
+    ("My heart races every time I have to speak in public", "fear"),
+    ("I'm scared something bad is going to happen", "fear"),
+    ("That smell in the bathroom made me want to throw up", "disgust"),
+    ("What he did to that animal is revolting", "disgust"),
+    ("Wow, I did not expect her to show up at all", "surprise"),
+    ("I can't believe they threw me a party, I had no idea", "surprise"),
+    ("I went to the store and bought some bread", "neutral"),
+    ("My appointment is on Tuesday at three", "neutral"),
+    ("I usually take the bus to work", "neutral"),
+    ("hi", "neutral"),
+]
+
+
+def measure(backend: str, batch_size: int, rounds: int) -> dict:
+    sys.path.insert(0, BACKEND_DIR)
+    from utils import load_emotion_analyzer
+
+    texts = [t for t, _ in SAMPLES]
+
+    start = time.perf_counter()
+    analyzer = load_emotion_analyzer(backend)
+    load_s = time.perf_counter() - start
+    analyzer(texts[:2])  # warm-up
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            analyzer(text)
+    single_ms = (time.perf_counter() - start) * 1000 / (rounds * len(texts))
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        labels = [r["label"].lower() for r in analyzer(texts, batch_size=batch_size)]
+    batched_ms = (time.perf_counter() - start) * 1000 / (rounds * len(texts))
+
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "ms_per_msg_single": round(single_ms, 2),
+        "ms_per_msg_batched": round(batched_ms, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "labels": labels,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["pytorch", "quantized", "onnx"])
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    backends = ["pytorch"] + [b for b in args.backends if b != "pytorch"]
+    expected = [label for _, label in SAMPLES]
+    ctx = multiprocessing.get_context("spawn")
+    reference = None
+
+    for backend in backends:
+        with ctx.Pool(1) as pool:
+            result = pool.apply(measure, (backend, args.batch_size, args.rounds))
+        labels = result.pop("labels")
+        reference = reference or labels
+        result["accuracy"] = round(sum(a == b for a, b in zip(labels, expected)) / len(expected), 3)
+        result["agreement_with_pytorch"] = round(sum(a == b for a, b in zip(labels, reference)) / len(reference), 3)
+        print(result)
@@ -0,0 +1,71 @@
+"""
+Batched vs. per-request emotion inference on CPU.
+
+Fires `--concurrency` classification requests at a time, first each running
+its own forward pass in the threadpool, then through the MicroBatcher, and
+prints latency and throughput for both. Needs the real model (torch).
+
+    python benchmarks/emotion_batching.py --requests 256 --concurrency 32
+"""
+import argparse, asyncio, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.concurrency import run_in_threadpool
+from batcher import MicroBatcher
+from utils import detect_emotion, detect_emotions, load_emotion_analyzer
+
+MESSAGES = [
+    "I feel anxious about tomorrow",
+    "Thanks, that actually helped a lot",
+    "I'm so angry at my manager right now",
+    "Nothing seems to matter anymore and I'm tired all the time",
+    "hi",
+    "I got the job!!",
+    "I can't sleep, my mind keeps racing about everything I said today",
+    "not sure how I feel honestly",
+]
+
+
+async def drive(classify, requests: int, concurrency: int) -> dict:
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with gate:
+            start = time.perf_counter()
+            await classify(MESSAGES[i % len(MESSAGES)])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput_msgs_per_s": round(requests / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+    }
+
+
+async def main(args):
+    load_emotion_analyzer()
+    detect_emotion("warm-up")
+
+    async def per_request(text):
+        return await run_in_threadpool(detect_emotion, text)
+
+    batcher = MicroBatcher(detect_emotions, args.batch_size, args.wait_ms)
+
+    print("per-request:", await drive(per_request, args.requests, args.concurrency))
+    print("batched:    ", await drive(batcher.submit, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--wait-ms", type=float, default=5)
+    asyncio.run(main(parser.parse_args()))
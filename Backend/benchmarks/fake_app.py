@@ -0,0 +1,17 @@
+"""
+The real app with the offline stand-ins installed, for benchmarking over
+real HTTP. Run from the Backend directory:
+
+    DATABASE_URL=sqlite:////tmp/bench.db FAKE_LLM_LATENCY=0.5 FAKE_LLM_TOKENS_PER_S=50 \
+        uvicorn benchmarks.fake_app:app --port 8010
+    python benchmarks/suite.py --url http://127.0.0.1:8010
+"""
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import stand_ins  # sets EMOTION_WORKERS before utils loads
+
+stand_ins.install_from_env()
+
+from main import app
@@ -0,0 +1,70 @@
+"""
+Logins per second through POST /api/v1/user/login at several concurrency
+levels, against a throwaway database seeded with test users.
+
+    python benchmarks/login_throughput.py --concurrency 1 8 32 --logins 64
+"""
+import argparse, asyncio, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import httpx
+import main
+
+USERS = 32
+
+
+async def seed(client: httpx.AsyncClient):
+    for i in range(USERS):
+        await client.post("/api/v1/user/create_user", json={
+            "username": f"bench{i}@mindcare.com", "password": "bench-password",
+            "role_name": "user", "full_name": f"Bench User{i}",
+        })
+
+
+async def run(client: httpx.AsyncClient, concurrency: int, logins: int) -> dict:
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with gate:
+            start = time.perf_counter()
+            r = await client.post("/api/v1/user/login", data={
+                "username": f"bench{i % USERS}@mindcare.com", "password": "bench-password",
+            })
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "logins_per_s": round(logins / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+    }
+
+
+async def main_async(args):
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            await seed(client)
+            for concurrency in args.concurrency:
+                print(await run(client, concurrency, args.logins))
+    finally:  # ASGITransport skips the app's lifespan, which would flush writes and close the pool
+        from extensions import async_engine
+        from persister import turn_writer
+        await turn_writer.drain()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--logins", type=int, default=64)
+    asyncio.run(main_async(parser.parse_args()))
@@ -0,0 +1,53 @@
+"""
+Topic relevance: accuracy of the hashed n-gram classifier vs. the old keyword
+scan on data/relevance_eval.tsv, and single vs. batched scoring throughput.
+
+    python benchmarks/relevance.py
+"""
+import os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from relevance import load_labelled, DATA_DIR
+from utils import IRRELEVANT_TOPICS, load_relevance_classifier
+
+
+def report(name: str, predicted_relevant: list, labels: list):
+    tp = sum(p and y for p, y in zip(predicted_relevant, labels))
+    tn = sum(not p and not y for p, y in zip(predicted_relevant, labels))
+    # Off-topic detection is the positive class: a false positive refuses a real user
+    fp = sum(not p and y for p, y in zip(predicted_relevant, labels))
+    fn = sum(p and not y for p, y in zip(predicted_relevant, labels))
+    print({
+        "method": name,
+        "accuracy": round((tp + tn) / len(labels), 3),
+        "off_topic_precision": round(tn / (tn + fp), 3) if tn + fp else None,
+        "off_topic_recall": round(tn / (tn + fn), 3) if tn + fn else None,
+        "on_topic_refused": fp,
+    })
+
+
+if __name__ == "__main__":
+    texts, labels = load_labelled(os.path.join(DATA_DIR, "relevance_eval.tsv"))
+    labels = [bool(y) for y in labels]
+
+    start = time.perf_counter()
+    clf = load_relevance_classifier()
+    print({"train_ms": round((time.perf_counter() - start) * 1000, 1), "threshold": clf.threshold})
+
+    report("keyword_scan", [not any(w in t.lower() for w in IRRELEVANT_TOPICS) for t in texts], labels)
+    report("classifier", [bool(r) for r in clf.is_relevant(texts)], labels)
+
+    batch = texts * 20
+    start = time.perf_counter()
+    for text in batch:
+        clf.scores([text])
+    single = time.perf_counter() - start
+    start = time.perf_counter()
+    clf.scores(batch)
+    batched = time.perf_counter() - start
+    print({
+        "messages": len(batch),
+        "single_us_per_msg": round(single * 1e6 / len(batch), 1),
+        "batched_us_per_msg": round(batched * 1e6 / len(batch), 1),
+    })
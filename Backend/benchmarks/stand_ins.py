@@ -0,0 +1,56 @@
+"""
+Offline stand-ins for Gemini and the emotion model, so benchmarks run
+without an API key or a model download.
+
+The LLM is the app's own OfflineProvider (fixed first-token latency, then
+words at a configurable rate) behind the usual ResilientLLM wrapper. The
+stub emotion classifier replaces utils.classify_emotions, so batching,
+caching and the worker-free in-process path are still exercised.
+"""
+import os, time
+
+# Must be set before utils is imported: worker processes would load the real model
+os.environ["EMOTION_WORKERS"] = "0"
+
+from config import LLM_MAX_CONCURRENCY
+from llm import OfflineProvider, ResilientLLM
+
+EMOTION_WORDS = {
+    "sadness": ("sad", "low", "lonely", "cry", "empty", "tired"),
+    "fear": ("anxious", "scared", "worried", "panic", "nervous", "afraid"),
+    "anger": ("angry", "furious", "annoyed", "hate", "frustrated"),
+    "joy": ("happy", "great", "better", "excited", "grateful"),
+}
+
+
+def stub_classify_emotions(texts: list, latency: float = 0.0) -> list:
+    """Keyword lookup with an optional fixed per-batch cost standing in for the forward pass."""
+    if latency:
+        time.sleep(latency)
+    labels = []
+    for text in texts:
+        lowered = text.lower()
+        labels.append(next(
+            (label for label, words in EMOTION_WORDS.items() if any(w in lowered for w in words)),
+            "neutral",
+        ))
+    return labels
+
+
+def install(llm_latency: float = 0.5, tokens_per_s: float = 50, emotion_latency: float = 0.01) -> ResilientLLM:
+    """Patch the chat pipeline in this process to use the stand-ins."""
+    import utils
+    import routes.chat as chat
+
+    llm = ResilientLLM(OfflineProvider(llm_latency, tokens_per_s), max_workers=2 * LLM_MAX_CONCURRENCY)
+    chat.get_llm = lambda: llm
+    utils.classify_emotions = lambda texts: stub_classify_emotions(texts, emotion_latency)
+    return llm
+
+
+def install_from_env() -> ResilientLLM:
+    return install(
+        llm_latency=float(os.getenv("FAKE_LLM_LATENCY", "0.5")),
+        tokens_per_s=float(os.getenv("FAKE_LLM_TOKENS_PER_S", "50")),
+        emotion_latency=float(os.getenv("FAKE_EMOTION_LATENCY", "0.01")),
+    )
@@ -0,0 +1,256 @@
+"""
+Mixed-traffic load test with offline stand-ins (see stand_ins.py).
+
+Each virtual user logs in, then loops for --duration seconds picking
+operations at random by weight from --mix: chat turns (plain and
+streamed), session list, history, admin stats and re-logins. Results per
+operation (throughput, error count, latency percentiles) are written to a
+JSON file, and --compare prints the change against an earlier run.
+
+    python benchmarks/suite.py --users 16 --duration 30 --output bench.json
+    python benchmarks/suite.py --users 16 --duration 30 --compare bench.json
+
+By default the app runs in-process on a throwaway database. With --url the
+suite drives a running server instead, e.g. benchmarks/fake_app.py under
+uvicorn (the stand-in options then come from that server's environment).
+"""
+import argparse, asyncio, json, math, os, platform, random, subprocess, sys, tempfile, time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+DEFAULT_MIX = "chat=40,stream=10,history=20,sessions=15,stats=5,login=10"
+PASSWORD = "bench-password"
+ADMIN = {"username": "admin@mindcare.com", "password": "admin123"}
+
+# Mostly ordinary check-ins, with the occasional off-topic and crisis message
+MESSAGES = (
+    ["I feel tired and low today", "Work has been really stressful lately",
+     "I couldn't sleep again last night", "I'm anxious about my exams next week",
+     "I had a good day and wanted to share it", "I keep arguing with my partner",
+     "How can I stop overthinking everything?", "I feel lonely since I moved cities",
+     "I'm frustrated that nothing seems to change", "Can you suggest a breathing exercise?"] * 10
+    + ["Write me a python script to sort a list", "What's a good pasta recipe?"] * 2
+    + ["I don't want to live anymore"]
+)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    async def time(self, op: str, request):
+        start = time.perf_counter()
+        try:
+            response = await request
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        if ok:
+            self.latencies.setdefault(op, []).append(time.perf_counter() - start)
+        else:
+            self.errors[op] = self.errors.get(op, 0) + 1
+        return response if ok else None
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))]
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    result = {"requests": len(latencies), "errors": errors, "throughput_rps": round(len(latencies) / elapsed, 2)}
+    if latencies:
+        result.update({
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+            "max_ms": round(latencies[-1] * 1000, 1),
+        })
+    return result
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, username: str, admin_headers: dict, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.username = username
+        self.admin_headers = admin_headers
+        self.rng = rng
+        self.headers = {}
+        self.session_id = None
+
+    async def login(self):
+        r = await self.recorder.time("login", self.client.post(
+            "/api/v1/user/login", data={"username": self.username, "password": PASSWORD}))
+        if r is not None:
+            self.headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    def next_message(self) -> dict:
+        if self.session_id and self.rng.random() < 0.2:
+            self.session_id = None  # start a new conversation now and then
+        return {"user_message": self.rng.choice(MESSAGES), "session_id": self.session_id}
+
+    async def chat(self):
+        r = await self.recorder.time("chat", self.client.post("/chat/", json=self.next_message(), headers=self.headers))
+        if r is not None:
+            self.session_id = r.json()["session_id"]
+
+    async def stream(self):
+        async def consume():
+            async with self.client.stream("POST", "/chat/stream", json=self.next_message(), headers=self.headers) as r:
+                body = "".join([chunk async for chunk in r.aiter_text()])
+            if r.status_code < 400 and '"session_id": "' in body:
+                self.session_id = body.split('"session_id": "', 1)[1].split('"', 1)[0]
+            return r
+
+        await self.recorder.time("stream", consume())
+
+    async def history(self):
+        if not self.session_id:
+            return await self.sessions()
+        await self.recorder.time("history", self.client.get(f"/chat/history/{self.session_id}", params={"limit": 50}))
+
+    async def sessions(self):
+        await self.recorder.time("sessions", self.client.get("/chat/sessions", headers=self.headers))
+
+    async def stats(self):
+        await self.recorder.time("stats", self.client.get("/api/v1/admin/stats", headers=self.admin_headers))
+
+    async def run(self, mix: dict, deadline: float, think_time: float):
+        await self.login()
+        ops, weights = list(mix), list(mix.values())
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(ops, weights)[0])()
+            if think_time:
+                await asyncio.sleep(self.rng.expovariate(1 / think_time))
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        op, weight = part.split("=")
+        if op.strip() not in ("chat", "stream", "history", "sessions", "stats", "login"):
+            raise SystemExit(f"Unknown operation in --mix: {op}")
+        mix[op.strip()] = float(weight)
+    return mix
+
+
+def make_client(args) -> httpx.AsyncClient:
+    if args.url:
+        return httpx.AsyncClient(base_url=args.url, timeout=120)
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+    if args.persist_mode:
+        os.environ["CHAT_PERSIST_MODE"] = args.persist_mode
+    from benchmarks import stand_ins
+    stand_ins.install(args.llm_latency, args.tokens_per_s, args.emotion_latency)
+    import main
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=120)
+
+
+async def seed(client: httpx.AsyncClient, users: int):
+    """Create the bench accounts; ones left over from an earlier run against --url are reused."""
+    for i in range(users):
+        await client.post("/api/v1/user/create_user", json={
+            "username": f"bench{i}@mindcare.com", "password": PASSWORD,
+            "role_name": "user", "full_name": f"Bench User{i}",
+        })
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(), "commit": commit}
+
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    recorder = Recorder()
+    async with make_client(args) as client:
+        await seed(client, args.users)
+        r = await client.post("/api/v1/user/login", data=ADMIN)
+        admin_headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            VirtualUser(client, recorder, f"bench{i}@mindcare.com", admin_headers, random.Random(args.seed + i))
+            .run(mix, deadline, args.think_time)
+            for i in range(args.users)
+        ))
+        elapsed = time.perf_counter() - start
+
+    if not args.url:  # ASGITransport skips the app's lifespan, which would flush writes and close the pool
+        from extensions import async_engine
+        from persister import turn_writer
+        await turn_writer.drain()
+        await async_engine.dispose()
+
+    operations = {
+        op: summarize(recorder.latencies.get(op, []), recorder.errors.get(op, 0), elapsed)
+        for op in sorted(set(recorder.latencies) | set(recorder.errors))
+    }
+    all_latencies = [v for values in recorder.latencies.values() for v in values]
+    return {
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "environment": environment(),
+        "elapsed_s": round(elapsed, 2),
+        "overall": summarize(all_latencies, sum(recorder.errors.values()), elapsed),
+        "operations": operations,
+    }
+
+
+def compare(current: dict, baseline: dict):
+    def change(new, old):
+        if new is None or old in (None, 0):
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    rows = [("overall", current["overall"], baseline.get("overall", {}))]
+    rows += [(op, stats, baseline.get("operations", {}).get(op, {})) for op, stats in current["operations"].items()]
+    print(f"{'operation':<10} {'rps':>16} {'p50_ms':>18} {'p95_ms':>18} {'p99_ms':>18} {'errors':>8}")
+    for op, new, old in rows:
+        cells = [f"{new.get(k)} ({change(new.get(k), old.get(k))})" for k in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")]
+        print(f"{op:<10} {cells[0]:>16} {cells[1]:>18} {cells[2]:>18} {cells[3]:>18} {new['errors']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="drive a running server instead of the in-process app")
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of traffic")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights")
+    parser.add_argument("--think-time", type=float, default=0, help="mean pause between a user's requests (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="fake LLM time to first token (s)")
+    parser.add_argument("--tokens-per-s", type=float, default=50, help="fake LLM token rate (0 = instant)")
+    parser.add_argument("--emotion-latency", type=float, default=0.01, help="stub emotion model cost per batch (s)")
+    parser.add_argument("--persist-mode", choices=["direct", "group", "write_behind"],
+                        help="CHAT_PERSIST_MODE for the in-process app (default: from the environment)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:  # read first: --output may point at the same file
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = asyncio.run(run(args))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results["overall"]))
+
+    if baseline:
+        compare(results, baseline)
+    else:
+        for op, stats in results["operations"].items():
+            print(op, json.dumps(stats))
@@ -0,0 +1,83 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Database
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./instance/mental_health_app.db")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")  # request handlers; derived from DATABASE_URL if unset
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))  # persistent connections per worker
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))  # extra connections opened under bursts
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # reopen connections older than this (s)
+
+# Auth
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))  # cached principals, 0 disables
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))  # seconds a principal is trusted without a DB read
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # changing it rehashes passwords on next login
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))  # concurrent bcrypt operations
+
+# LLM
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-2.0-flash")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # in-flight LLM calls per worker
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")  # gemini | offline (canned reply, no network)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))  # seconds per reply, retries included
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))  # extra attempts on transient errors
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))  # base of the jittered exponential backoff
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))  # send a second request after this many seconds (0 = off)
+LLM_OFFLINE_LATENCY = float(os.getenv("LLM_OFFLINE_LATENCY", "0"))  # offline provider: seconds before replying
+LLM_OFFLINE_TOKENS_PER_S = float(os.getenv("LLM_OFFLINE_TOKENS_PER_S", "0"))  # offline provider: word rate (0 = instant)
+
+# Chat context
+CONTEXT_WINDOW = int(os.getenv("CONTEXT_WINDOW", "6"))  # recent messages included in the prompt
+CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", "10000"))  # active sessions kept in memory (0 disables)
+# Idle seconds before a session's context is dropped. Each worker process has its own cache, so with
+# several workers keep sessions sticky or this short: another worker's turns are not seen until expiry
+CONTEXT_CACHE_TTL = float(os.getenv("CONTEXT_CACHE_TTL", "1800"))
+
+# Prompt budget (token counts are estimates, see tokens.py)
+PROMPT_CONTEXT_TOKENS = int(os.getenv("PROMPT_CONTEXT_TOKENS", "800"))  # summary + recent messages
+PROMPT_MESSAGE_TOKENS = int(os.getenv("PROMPT_MESSAGE_TOKENS", "200"))  # cap on each earlier message quoted
+PROMPT_INPUT_TOKENS = int(os.getenv("PROMPT_INPUT_TOKENS", "1000"))  # cap on the message being answered
+SUMMARY_TOKENS = int(os.getenv("SUMMARY_TOKENS", "200"))  # length of the rolling conversation summary
+SUMMARY_AFTER = int(os.getenv("SUMMARY_AFTER", "6"))  # unsummarised messages beyond CONTEXT_WINDOW before an update
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "2"))  # background summary LLM calls
+
+# Chat persistence (see persister.py for what each mode guarantees)
+CHAT_PERSIST_MODE = os.getenv("CHAT_PERSIST_MODE", "direct")  # direct | group | write_behind
+CHAT_FLUSH_INTERVAL_MS = float(os.getenv("CHAT_FLUSH_INTERVAL_MS", "5"))  # how long a batch collects turns
+CHAT_FLUSH_MAX_TURNS = int(os.getenv("CHAT_FLUSH_MAX_TURNS", "128"))  # turns per transaction at most
+
+# Admin export and bulk actions
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "2000"))  # messages fetched per query while streaming an export
+BULK_CHUNK_USERS = int(os.getenv("BULK_CHUNK_USERS", "500"))  # users per transaction in bulk block/unblock/delete
+
+# Emotion model
+EMOTION_MODEL_NAME = os.getenv("EMOTION_MODEL_NAME", "j-hartmann/emotion-english-distilroberta-base")
+EMOTION_BACKEND = os.getenv("EMOTION_BACKEND", "pytorch")  # pytorch | quantized | onnx
+EMOTION_ONNX_DIR = os.getenv("EMOTION_ONNX_DIR", "./instance/onnx_emotion")  # exported graph cache
+EMOTION_BATCH_SIZE = int(os.getenv("EMOTION_BATCH_SIZE", "16"))  # max messages per forward pass
+EMOTION_BATCH_WAIT_MS = float(os.getenv("EMOTION_BATCH_WAIT_MS", "5"))  # how long to wait for a batch to fill
+EMOTION_REQUEST_TIMEOUT = float(os.getenv("EMOTION_REQUEST_TIMEOUT", "3"))  # seconds a chat turn waits for its emotion, else "neutral"
+EMOTION_CACHE_SIZE = int(os.getenv("EMOTION_CACHE_SIZE", "4096"))  # cached predictions, 0 disables
+EMOTION_CACHE_TTL = float(os.getenv("EMOTION_CACHE_TTL", "86400"))  # seconds
+EMOTION_CACHE_MAX_CHARS = int(os.getenv("EMOTION_CACHE_MAX_CHARS", "200"))  # longer messages aren't cached
+EMOTION_WORKERS = int(os.getenv("EMOTION_WORKERS", "0"))  # inference processes, 0 runs in the API process
+EMOTION_WORKER_TIMEOUT = float(os.getenv("EMOTION_WORKER_TIMEOUT", "30"))  # seconds before a worker is presumed hung
+EMOTION_WORKER_START_TIMEOUT = float(os.getenv("EMOTION_WORKER_START_TIMEOUT", "300"))  # seconds new workers may take to load the model
+EMOTION_WORKER_HEALTH_INTERVAL = float(os.getenv("EMOTION_WORKER_HEALTH_INTERVAL", "15"))  # seconds between idle pings
+
+# Crisis detection
+CRISIS_PHRASES_FILE = os.getenv("CRISIS_PHRASES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "crisis_phrases.txt"))
+CRISIS_PHRASES_RELOAD_INTERVAL = float(os.getenv("CRISIS_PHRASES_RELOAD_INTERVAL", "5"))  # seconds between file checks, 0 disables
+
+# Topic relevance
+RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "0.4"))  # below this a message is treated as off-topic
+
+# Latency accounting
+LATENCY_RETENTION_MINUTES = int(os.getenv("LATENCY_RETENTION_MINUTES", "1440"))  # per-minute histograms kept for /admin/stats
+
+# Metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"  # serve /metrics and count requests
+TRACE_SPANS = os.getenv("TRACE_SPANS", "0") == "1"  # print per-request stage timings with a trace id
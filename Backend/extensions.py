@@ -1,20 +1,43 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from config import DATABASE_URL, ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
 
-DATABASE_URL = "sqlite:///./instance/mental_health_app.db"
+# Async drivers for the dialects DATABASE_URL is expected to use
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
 
+def async_url(url: str):
+    """The async equivalent of a sync database URL (e.g. sqlite:// -> sqlite+aiosqlite://)."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    return url.set(drivername=ASYNC_DRIVERS[backend]) if backend in ASYNC_DRIVERS else url
+
+def pool_options(url) -> dict:
+    # In-memory SQLite is one shared connection (StaticPool), which takes no sizing
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT, "pool_recycle": DB_POOL_RECYCLE}
+
+# Sync engine for startup (create_all, migrations, the admin seed) and scripts
 engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
+    DATABASE_URL,
+    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for request handlers: waiting on the database doesn't hold a worker thread
+async_db_url = async_url(ASYNC_DATABASE_URL or DATABASE_URL)
+async_engine = create_async_engine(async_db_url, **pool_options(async_db_url))
+
+# Attributes stay loaded after commit, since an async session can't lazy-load them on access
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 SQLBase = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
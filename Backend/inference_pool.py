@@ -0,0 +1,150 @@
+import multiprocessing, os, threading, time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+
+class PoolNotReady(RuntimeError):
+    """The workers are still running their initializer."""
+
+
+class WorkerPool:
+    """
+    Pool of worker processes that each run `initializer` once (e.g. to load a
+    model) and then execute `task` calls, so CPU-bound work escapes the GIL.
+
+    A crashed worker breaks the executor and a hung one times out; either way
+    the call fails and the pool is replaced. New workers warm up in the
+    background, and until they have, calls raise PoolNotReady at once rather
+    than wait behind a model load: callers fall back instead. While idle, a
+    monitor thread pings the workers every `health_interval` seconds, and
+    replaces workers that haven't warmed up within `start_timeout`.
+    """
+
+    def __init__(self, task, initializer=None, workers: int = 2, timeout: float = 30, health_interval: float = 15,
+                 start_timeout: float = 300):
+        self.task = task
+        self.initializer = initializer
+        self.workers = workers
+        self.timeout = timeout
+        self.start_timeout = max(timeout, start_timeout)
+        self.health_interval = health_interval
+        self.restarts = 0
+        self.healthy = True
+        self._pending = 0
+        self._executor = None
+        self._ready = None  # the executor whose workers have finished initializing
+        self._warming = None  # first call on the current executor, and when it was sent
+        self._warm_started = 0
+        self._monitor = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._spawn()
+            if self.health_interval and self._monitor is None:
+                self._monitor = threading.Thread(target=self._watch, daemon=True)
+                self._monitor.start()
+
+    def _spawn(self):
+        # spawn, not fork: torch does not survive forking a process that already uses threads
+        executor = ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=self.initializer,
+        )
+        # The first call starts the workers, which run the initializer before answering
+        self._warm_started = time.monotonic()
+        self._warming = executor.submit(os.getpid)
+        self._warming.add_done_callback(lambda future: self._warmed(executor, future))
+        return executor
+
+    def _warmed(self, executor, future):
+        if not future.cancelled() and future.exception() is None:
+            self._ready = executor
+            self.healthy = True
+
+    @property
+    def ready(self) -> bool:
+        return self._executor is not None and self._executor is self._ready
+
+    def warm_up(self):
+        """Wait for the workers to initialize; raises if they fail to or take over `start_timeout`."""
+        self.start()
+        executor, warming = self._executor, self._warming
+        try:
+            warming.result(timeout=self.start_timeout)
+        except FutureTimeout:
+            self.healthy = False
+            self.restart(executor)
+            raise
+
+    def restart(self, executor):
+        with self._lock:
+            if self._executor is not executor:  # already replaced by another thread
+                return
+            self._executor = self._spawn()
+            self.restarts += 1
+
+        # Hung workers would outlive shutdown(), so terminate them explicitly
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, *args):
+        self.start()
+        executor = self._executor
+        if executor is not self._ready:
+            raise PoolNotReady("Workers are still starting")
+        with self._lock:
+            self._pending += 1
+        try:
+            result = executor.submit(self.task, *args).result(timeout=self.timeout)
+            self.healthy = True
+            return result
+        except (BrokenProcessPool, FutureTimeout):
+            # Not retried: the replacement has to load the model before it can answer
+            self.healthy = False
+            self.restart(executor)
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _watch(self):
+        while not self._closed:
+            time.sleep(self.health_interval)
+            executor = self._executor
+            if self._closed or self._pending:  # busy workers prove liveness through run()
+                continue
+            if executor is not self._ready:
+                warming = self._warming
+                failed = warming.done() and (warming.cancelled() or warming.exception() is not None)
+                if failed or time.monotonic() - self._warm_started > self.start_timeout:
+                    self.healthy = False
+                    self.restart(executor)
+                continue
+            try:
+                executor.submit(os.getpid).result(timeout=self.timeout)
+                self.healthy = True
+            except Exception:
+                self.healthy = False
+                self.restart(executor)
+
+    def shutdown(self):
+        self._closed = True
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self._executor is not None,
+            "ready": self.ready,
+            "healthy": self.healthy,
+            "queue_depth": self._pending,
+            "restarts": self.restarts,
+        }
@@ -0,0 +1,128 @@
+import math, threading, time
+from contextlib import contextmanager
+
+# Log-spaced histogram buckets: 4 per doubling from 1 ms, so a percentile
+# read back from a bucket is within ~10% of the true value
+MIN_MS = 1.0
+BUCKETS_PER_DOUBLING = 4
+N_BUCKETS = 72  # up to ~4 minutes; slower samples land in the last bucket
+
+
+def bucket_index(ms: float) -> int:
+    if ms <= MIN_MS:
+        return 0
+    return min(N_BUCKETS - 1, int(math.log2(ms / MIN_MS) * BUCKETS_PER_DOUBLING) + 1)
+
+
+def bucket_bounds(index: int):
+    if index == 0:
+        return 0.0, MIN_MS
+    return (MIN_MS * 2 ** ((index - 1) / BUCKETS_PER_DOUBLING),
+            MIN_MS * 2 ** (index / BUCKETS_PER_DOUBLING))
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = {}  # bucket -> samples; sparse, most minutes touch few buckets
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        index = bucket_index(ms)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def merge(self, other):
+        for index, n in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + n
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, q: float) -> float:
+        """Interpolates linearly inside the bucket holding the q-th sample."""
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            n = self.counts[index]
+            if seen + n >= rank:
+                low, high = bucket_bounds(index)
+                high = min(high, self.max_ms)
+                return low + (high - low) * max(0.0, rank - seen) / n
+            seen += n
+        return self.max_ms
+
+
+class LatencyRecorder:
+    """
+    Rolling latency aggregate: one small histogram per stage per minute,
+    kept for `retention_minutes`. Recording is O(1) and a summary merges
+    at most one histogram per minute in the window, never raw samples.
+    """
+
+    def __init__(self, retention_minutes: int = 1440):
+        self.retention_minutes = retention_minutes
+        self.started = time.time()
+        self.listeners = []  # called as listener(stage, seconds), e.g. to export metrics
+        self._minutes = {}  # minute -> {stage: _Histogram}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, now: float = None):
+        minute = int((now or time.time()) // 60)
+        with self._lock:
+            stages = self._minutes.get(minute)
+            if stages is None:
+                stages = self._minutes[minute] = {}
+                self._expire(minute)
+            histogram = stages.get(stage)
+            if histogram is None:
+                histogram = stages[stage] = _Histogram()
+            histogram.add(seconds * 1000)
+        for listener in self.listeners:
+            listener(stage, seconds)
+
+    def _expire(self, minute: int):
+        oldest = minute - self.retention_minutes
+        for old in [m for m in self._minutes if m <= oldest]:
+            del self._minutes[old]
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def summary(self, window_seconds: int, now: float = None) -> dict:
+        """Per-stage count, throughput and avg/p50/p95/p99/max (ms) over the last `window_seconds`."""
+        now = now or time.time()
+        first_minute = int((now - window_seconds) // 60) + 1
+        merged = {}
+        with self._lock:
+            for minute, stages in self._minutes.items():
+                if minute < first_minute:
+                    continue
+                for stage, histogram in stages.items():
+                    merged.setdefault(stage, _Histogram()).merge(histogram)
+
+        # Don't dilute throughput with time before the process started
+        elapsed_s = max(1.0, min(window_seconds, now - self.started))
+        return {
+            stage: {
+                "count": h.count,
+                "per_minute": round(h.count * 60 / elapsed_s, 2),
+                "avg_ms": round(h.total_ms / h.count, 1),
+                "p50_ms": round(h.percentile(0.50), 1),
+                "p95_ms": round(h.percentile(0.95), 1),
+                "p99_ms": round(h.percentile(0.99), 1),
+                "max_ms": round(h.max_ms, 1),
+            }
+            for stage, h in merged.items()
+            if h.count
+        }
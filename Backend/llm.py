@@ -0,0 +1,230 @@
+"""
+LLM providers behind one interface, plus ResilientLLM which adds a
+per-call deadline, jittered retries on transient errors and optional
+hedging. The provider is picked by LLM_PROVIDER (see make_provider).
+"""
+import random, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from metrics import registry
+
+LLM_RETRIES = registry.counter("llm_retries_total", "LLM calls retried after a transient error.")
+LLM_HEDGES = registry.counter("llm_hedges_total", "Hedged second LLM requests, by which request won.", ["winner"])
+
+_END = object()  # end of a provider's stream
+
+
+class LLMError(Exception):
+    """The provider failed and retrying did not help (or wasn't allowed)."""
+
+
+class LLMTimeout(LLMError):
+    """No reply within the call's deadline."""
+
+
+class LLMProvider:
+    name = "base"
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, timeout: float):
+        """Yield the reply in chunks; the default yields it whole."""
+        yield self.generate(prompt, timeout)
+
+    def is_transient(self, error: Exception) -> bool:
+        """Whether `error` is worth retrying (rate limits, overload, network)."""
+        return isinstance(error, (ConnectionError, TimeoutError))
+
+    def warm_up(self):
+        pass
+
+
+class GeminiProvider(LLMProvider):
+    """
+    One long-lived GenerativeModel per process. The SDK keeps its transport
+    (and connection pool) on the configured client, so reusing the model
+    skips per-request setup.
+    """
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str):
+        self.api_key = api_key
+        self.model_name = model_name
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            # google.generativeai is slow to import, so it is only loaded on first use / warm-up
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def warm_up(self):
+        self.model
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        response = self.model.generate_content(prompt, request_options={"timeout": timeout})
+        try:
+            return response.text
+        except ValueError as e:  # no text parts, e.g. a safety block
+            raise LLMError(f"Empty reply from {self.model_name}") from e
+
+    def stream(self, prompt: str, timeout: float):
+        for chunk in self.model.generate_content(prompt, stream=True, request_options={"timeout": timeout}):
+            try:
+                text = chunk.text
+            except ValueError:  # chunk without text parts (e.g. safety block)
+                continue
+            if text:
+                yield text
+
+    def is_transient(self, error: Exception) -> bool:
+        from google.api_core import exceptions
+        return super().is_transient(error) or isinstance(error, (
+            exceptions.TooManyRequests, exceptions.ResourceExhausted, exceptions.ServiceUnavailable,
+            exceptions.InternalServerError, exceptions.DeadlineExceeded, exceptions.GatewayTimeout,
+        ))
+
+
+class OfflineProvider(LLMProvider):
+    """
+    Canned supportive reply after `latency` seconds, emitted at
+    `tokens_per_s` words per second (0 = all at once). Needs no network,
+    for local development, tests and benchmarks.
+    """
+    name = "offline"
+    REPLY = (
+        "It sounds like a lot has been weighing on you lately. It's okay to feel this way. "
+        "Would it help to talk through what happened, or to try a short breathing exercise together?"
+    )
+
+    def __init__(self, latency: float = 0.0, tokens_per_s: float = 0.0):
+        self.latency = latency
+        self.tokens_per_s = tokens_per_s
+
+    def stream(self, prompt: str, timeout: float):
+        time.sleep(self.latency)
+        words = self.REPLY.split(" ")
+        delay = 1 / self.tokens_per_s if self.tokens_per_s > 0 else 0
+        for i, word in enumerate(words):
+            if delay:
+                time.sleep(delay)
+            yield word if i == len(words) - 1 else word + " "
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        return "".join(self.stream(prompt, timeout))
+
+
+class ResilientLLM:
+    """
+    Calls `provider` with a total `timeout` per reply. Transient errors are
+    retried up to `retries` times with full-jitter exponential backoff, as
+    long as the deadline allows. With `hedge_after` > 0, a second identical
+    request is sent if the first hasn't answered by then, and whichever
+    finishes first wins.
+
+    Attempts run on a private thread pool so the deadline holds even if the
+    provider ignores its timeout; a late attempt is left to finish and its
+    result discarded.
+    """
+
+    def __init__(self, provider: LLMProvider, timeout: float = 30, retries: int = 2,
+                 backoff: float = 0.5, max_backoff: float = 4, hedge_after: float = 0, max_workers: int = 16):
+        self.provider = provider
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="llm")
+
+    def warm_up(self):
+        self.provider.warm_up()
+
+    def _sleep_before_retry(self, attempt: int, deadline: float):
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if time.monotonic() + delay >= deadline:
+            raise LLMTimeout(f"{self.provider.name} did not answer within {self.timeout}s")
+        LLM_RETRIES.inc()
+        time.sleep(delay)
+
+    def _attempt(self, prompt: str, deadline: float) -> str:
+        remaining = deadline - time.monotonic()
+        first = self._executor.submit(self.provider.generate, prompt, remaining)
+        pending = {first}
+
+        hedged = False
+        if self.hedge_after and self.hedge_after < remaining:
+            done, _ = wait(pending, timeout=self.hedge_after)
+            if not done:
+                pending.add(self._executor.submit(self.provider.generate, prompt, deadline - time.monotonic()))
+                hedged = True
+
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if hedged:
+                        LLM_HEDGES.inc("first" if future is first else "hedge")
+                    return future.result()
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        raise LLMTimeout(f"{self.provider.name} did not answer within {self.timeout}s")
+
+    def generate(self, prompt: str) -> str:
+        deadline = time.monotonic() + self.timeout
+        for attempt in range(self.retries + 1):
+            try:
+                return self._attempt(prompt, deadline)
+            except LLMError:
+                raise
+            except Exception as e:
+                if attempt == self.retries or not self.provider.is_transient(e):
+                    raise LLMError(f"{self.provider.name} failed: {e}") from e
+                self._sleep_before_retry(attempt, deadline)
+
+    def _next_chunk(self, chunks, deadline: float, started: bool):
+        """Pull the next chunk on the pool, so a stalled provider can't outlast the deadline."""
+        future = self._executor.submit(next, chunks, _END)
+        done, _ = wait([future], timeout=max(0, deadline - time.monotonic()))
+        if not done:
+            raise LLMTimeout(f"{self.provider.name} did not {'finish' if started else 'answer'} within {self.timeout}s")
+        return future.result()
+
+    def stream(self, prompt: str):
+        """
+        Retries only until the first chunk arrives; after that a failure is
+        raised, since replaying would duplicate text the client already has.
+        Hedging does not apply to streams. Like generate, each chunk is
+        awaited on the pool, so the deadline holds even while the provider
+        stalls before or between chunks.
+        """
+        deadline = time.monotonic() + self.timeout
+        for attempt in range(self.retries + 1):
+            started = False
+            try:
+                chunks = self.provider.stream(prompt, deadline - time.monotonic())
+                while (text := self._next_chunk(chunks, deadline, started)) is not _END:
+                    started = True
+                    yield text
+                return
+            except LLMError:
+                raise
+            except Exception as e:
+                if started or attempt == self.retries or not self.provider.is_transient(e):
+                    raise LLMError(f"{self.provider.name} failed: {e}") from e
+                self._sleep_before_retry(attempt, deadline)
+
+
+def make_provider(name: str, **settings) -> LLMProvider:
+    if name == "gemini":
+        return GeminiProvider(settings["api_key"], settings["model_name"])
+    if name == "offline":
+        return OfflineProvider(settings.get("offline_latency", 0.0), settings.get("offline_tokens_per_s", 0.0))
+    raise ValueError(f"Unknown LLM_PROVIDER {name!r} (expected 'gemini' or 'offline')")
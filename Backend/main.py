@@ -1,9 +1,18 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
 from routes.user import user_router
 from routes.admin import admin_router
-from routes.chat import chat_router
+from routes.chat import chat_router, readiness, warm_up, backfill_crisis_flags, chat_latency
 from extensions import *
-from models import create_admin
+from models import create_admin, upgrade_schema
+from search import install_search_index, rebuild_search_index
+from utils import emotion_batcher, emotion_pool
+from persister import turn_writer
+from config import METRICS_ENABLED, TRACE_SPANS
+from metrics import CHAT_STAGE_DURATION, CONTENT_TYPE, MetricsMiddleware, log_span, registry
+import asyncio
 
 from fastapi.middleware.cors import CORSMiddleware
 origins = [
@@ -13,7 +22,19 @@ origins = [
     "http://127.0.0.1:5174"
 ]
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the emotion model and LLM client in the background so login,
+    # profile and admin traffic is served while the chat path loads
+    warm_up_task = asyncio.create_task(run_in_threadpool(warm_up))
+    yield
+    warm_up_task.cancel()
+    if emotion_pool:
+        emotion_pool.shutdown()
+    await turn_writer.drain()  # store write-behind turns before the pool closes
+    await async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -22,8 +43,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if METRICS_ENABLED or TRACE_SPANS:
+    app.add_middleware(MetricsMiddleware, trace=TRACE_SPANS)
+if METRICS_ENABLED:
+    chat_latency.listeners.append(lambda stage, seconds: CHAT_STAGE_DURATION.observe(seconds, stage))
+if TRACE_SPANS:
+    chat_latency.listeners.append(log_span)
+
+def db_pool_usage():
+    pool = async_engine.pool  # the request handlers' pool; StaticPool and NullPool don't track all of these
+    return {(state,): getattr(pool, state)() for state in ("size", "checkedout", "overflow") if hasattr(pool, state)}
+
+registry.gauge("db_pool_connections", "SQLAlchemy pool size, connections checked out and overflow.",
+               ["state"], fn=db_pool_usage)
+registry.gauge("emotion_batch_queue_depth", "Messages waiting to join an emotion batch.",
+               fn=lambda: emotion_batcher.queue_depth)
+registry.gauge("chat_write_queue_depth", "Chat turns queued for the next batched write.",
+               fn=lambda: turn_writer.queue_depth)
+registry.gauge("emotion_worker_queue_depth", "Emotion batches submitted to the worker processes and not yet done.",
+               fn=lambda: emotion_pool.stats()["queue_depth"] if emotion_pool else 0)
+
 SQLBase.metadata.create_all(bind=engine)
+if "chat_sessions.has_crisis" in upgrade_schema(engine):
+    backfill_crisis_flags(engine)
+if install_search_index(engine):
+    rebuild_search_index(engine)  # index messages written before search existed
 create_admin(session=SessionLocal(), first_name="admin", last_name="")
 app.include_router(admin_router)
 app.include_router(user_router)
-app.include_router(chat_router)
\ No newline at end of file
+app.include_router(chat_router)
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+@app.get("/ready")
+def ready():
+    is_ready = all(loaded for name, loaded in readiness.items() if name != "errors")
+    return JSONResponse(status_code=200 if is_ready else 503, content={"ready": is_ready, **readiness})
+
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(registry.render(), media_type=CONTENT_TYPE)
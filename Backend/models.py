@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, func
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, Index, Boolean, func, inspect, select, text, update
 from sqlalchemy.orm import relationship
 from datetime import date, datetime
 import enum
@@ -80,8 +80,8 @@ class Login(SQLBaseModel):
     user = relationship("User", back_populates="login")
 
     session_count = Column(Integer, default=0)
-    created_at = Column(DateTime, default=datetime.now(ist))
-    last_login = Column(DateTime, onupdate=datetime.now(ist))
+    created_at = Column(DateTime, default=lambda: datetime.now(ist))
+    last_login = Column(DateTime, onupdate=lambda: datetime.now(ist))
     days_active = Column(Integer, default=0)
 
     def __repr__(self):
@@ -98,8 +98,8 @@ class User(SQLBaseModel):
     phone_number = Column(String(15), nullable=True)
     user_status = Column(Enum(UserStatus), default=UserStatus.active, nullable=False)
 
-    created_at = Column(DateTime, default=datetime.now(ist))
-    updated_at = Column(DateTime, default=datetime.now(ist))
+    created_at = Column(DateTime, default=lambda: datetime.now(ist))
+    updated_at = Column(DateTime, default=lambda: datetime.now(ist))
 
     login = relationship("Login", back_populates="user", uselist=False)
 
@@ -162,7 +162,7 @@ class Support_Request(SQLBaseModel):
     title = Column(String(100), nullable=False)
     description = Column(Text, nullable=False)
     status = Column(Enum(RequestStatus), default=RequestStatus.open, nullable=False)
-    created_at = Column(DateTime, default=datetime.now(ist))
+    created_at = Column(DateTime, default=lambda: datetime.now(ist))
     priority = Column(Enum(RequestPriority), default=RequestPriority.medium, nullable=False)
 
     user = relationship("User", back_populates="support_requests")
@@ -172,24 +172,106 @@ class Support_Request(SQLBaseModel):
     
 class ChatSession(SQLBaseModel):
     __tablename__ = "chat_sessions"
+    __table_args__ = (
+        # Session listings sort by last activity, per user and across all users
+        Index("ix_chat_sessions_user_id_last_message_at", "user_id", "last_message_at"),
+        Index("ix_chat_sessions_last_message_at", "last_message_at"),
+        Index("ix_chat_sessions_has_crisis_last_message_at", "has_crisis", "last_message_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=True)
     session_uuid = Column(String, unique=True, index=True)
-    created_at = Column(DateTime, default=datetime.now(ist))
+    created_at = Column(DateTime, default=lambda: datetime.now(ist))
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    # Denormalised from chat_messages so listings need no per-session query;
+    # a session with no messages yet counts as active when it was created
+    last_message_at = Column(DateTime, nullable=True, default=lambda: datetime.now(ist))
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    has_crisis = Column(Boolean, nullable=False, default=False, server_default="0")
+    # Rolling summary of the conversation up to and including message summary_message_id
+    summary = Column(Text, nullable=True)
+    summary_message_id = Column(Integer, nullable=True)
     
     user = relationship("User", back_populates="conversations")
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete")
 
 class ChatMessage(SQLBaseModel):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Keyset pagination of a session's history walks this index
+        Index("ix_chat_messages_session_id_id", "session_id", "id"),
+        Index("ix_chat_messages_session_id_created_at", "session_id", "created_at"),
+        # Admin emotion filter resolves matching sessions from this index alone
+        Index("ix_chat_messages_emotion_session_id", "emotion", "session_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("chat_sessions.id"))
     role = Column(String)  # "user" or "bot"
     content = Column(Text)
     emotion = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.now(ist))
-
-    session = relationship("ChatSession", back_populates="messages")
\ No newline at end of file
+    created_at = Column(DateTime, default=lambda: datetime.now(ist))
+
+    session = relationship("ChatSession", back_populates="messages")
+
+async def record_messages(db, session_id: int, count: int, at=None, crisis=False):
+    """Bump a session's message_count and last_message_at for `count` new messages."""
+    at = at or datetime.now(ist)
+    values = {
+        ChatSession.message_count: func.coalesce(ChatSession.message_count, 0) + count,
+        ChatSession.last_message_at: at,
+    }
+    if crisis:
+        values[ChatSession.has_crisis] = True
+    await db.execute(update(ChatSession).where(ChatSession.id == session_id).values(values))
+    return at
+
+def backfill_session_activity(bind):
+    """
+    Recompute message_count and last_message_at of every session from
+    chat_messages; sessions without messages count as active when created.
+    """
+    messages = ChatMessage.__table__
+    sessions = ChatSession.__table__
+    of_session = messages.c.session_id == sessions.c.id
+    with bind.begin() as conn:
+        conn.execute(sessions.update().values(
+            message_count=select(func.count()).where(of_session).scalar_subquery(),
+            last_message_at=func.coalesce(
+                select(func.max(messages.c.created_at)).where(of_session).scalar_subquery(),
+                sessions.c.created_at,
+            ),
+        ))
+
+def upgrade_schema(bind):
+    """
+    create_all only creates missing tables, so columns and indexes added to
+    existing tables later are created here (a no-op once they exist).
+    """
+    added = []
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in SQLBase.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(bind.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                conn.execute(text(ddl))
+                added.append(f"{table.name}.{column.name}")
+
+    for table in SQLBase.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+    sessions = ChatSession.__table__
+    if "chat_sessions.last_message_at" in added or "chat_sessions.message_count" in added:
+        backfill_session_activity(bind)
+    else:
+        with bind.begin() as conn:  # empty sessions from before creation set last_message_at
+            conn.execute(sessions.update().where(sessions.c.last_message_at.is_(None))
+                         .values(last_message_at=sessions.c.created_at))
+    return added
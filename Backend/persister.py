@@ -0,0 +1,108 @@
+"""
+Group commit for chat turns. On SQLite every commit is an fsync behind the
+single writer lock, so committing each turn on its own caps messages/sec at
+the disk's sync rate. With CHAT_PERSIST_MODE set to `group` or
+`write_behind`, turns are queued and written in one transaction per batch,
+collected for CHAT_FLUSH_INTERVAL_MS or until CHAT_FLUSH_MAX_TURNS are queued.
+
+Durability by mode:
+
+- direct: each turn commits before the reply is returned (the default).
+- group: same guarantee as direct. The request waits for its batch to
+  commit and fails if the batch does.
+- write_behind: the reply is returned before its turn is stored. If the
+  process dies, turns still queued or being flushed are lost (normally one
+  flush interval's worth). A clean shutdown flushes the queue. A batch
+  that fails to commit is logged and dropped.
+
+Reads see pending writes: handlers that read messages from the database
+call settle() first, and the in-memory context cache already holds each
+turn as it is queued.
+"""
+import asyncio, logging
+from datetime import datetime
+from sqlalchemy import insert, update
+from batcher import MicroBatcher
+from config import CHAT_PERSIST_MODE, CHAT_FLUSH_INTERVAL_MS, CHAT_FLUSH_MAX_TURNS
+from extensions import AsyncSessionLocal
+from models import ChatMessage, ChatSession, ist, record_messages
+
+logger = logging.getLogger(__name__)
+
+if CHAT_PERSIST_MODE not in ("direct", "group", "write_behind"):
+    raise ValueError(f"Unknown CHAT_PERSIST_MODE {CHAT_PERSIST_MODE!r} (expected direct, group or write_behind)")
+
+
+class PendingTurn:
+    __slots__ = ("session_id", "messages", "crisis", "title", "at")
+
+    def __init__(self, session_id: int, messages: list, crisis: bool = False, title=None):
+        self.session_id = session_id
+        self.messages = messages  # ChatMessage column values, in order
+        self.crisis = crisis
+        self.title = title  # set only if the session had no title yet
+        self.at = datetime.now(ist)
+
+
+async def write_turns(turns: list) -> list:
+    """Insert every turn's messages and update their sessions in one transaction."""
+    sessions = {}
+    for turn in turns:
+        count, _, crisis, title = sessions.get(turn.session_id, (0, None, False, None))
+        sessions[turn.session_id] = (count + len(turn.messages), turn.at, crisis or turn.crisis, title or turn.title)
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(ChatMessage), [
+            {"session_id": turn.session_id, "created_at": turn.at, **message}
+            for turn in turns for message in turn.messages
+        ])
+        for session_id, (count, at, crisis, title) in sessions.items():
+            await record_messages(db, session_id, count, at, crisis)
+            if title:
+                await db.execute(update(ChatSession)
+                                 .where(ChatSession.id == session_id, ChatSession.title.is_(None))
+                                 .values(title=title))
+        await db.commit()
+    return [None] * len(turns)
+
+
+# One batch at a time: keeps each session's turns in order, and SQLite has one writer anyway
+turn_writer = MicroBatcher(write_turns, max_batch_size=CHAT_FLUSH_MAX_TURNS,
+                           max_wait_ms=CHAT_FLUSH_INTERVAL_MS, max_concurrent_batches=1)
+
+# Latest queued write per session id, for read-your-writes
+last_writes = {}
+
+
+def _report_failure(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.exception("Dropped a batch of chat messages", exc_info=future.exception())
+
+
+def queue_turn(turn: PendingTurn) -> asyncio.Future:
+    """Queue `turn` for the next batch; the future resolves once it is committed."""
+    future = turn_writer.submit_nowait(turn)
+    last_writes[turn.session_id] = future
+
+    def forget(done):
+        if last_writes.get(turn.session_id) is done:
+            del last_writes[turn.session_id]
+
+    future.add_done_callback(forget)
+    if CHAT_PERSIST_MODE == "write_behind":
+        future.add_done_callback(_report_failure)
+    return future
+
+
+async def settle(session_id: int = None) -> bool:
+    """
+    Wait for queued writes of `session_id` (or of every session) to be
+    committed. Returns whether there were any.
+    """
+    if session_id is None:
+        futures = list(last_writes.values())
+    else:
+        futures = [last_writes[session_id]] if session_id in last_writes else []
+    if futures:
+        await asyncio.wait(futures)
+    return bool(futures)
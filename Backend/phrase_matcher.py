@@ -0,0 +1,127 @@
+import logging, os, re, threading, time
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, unify curly apostrophes and collapse whitespace before matching."""
+    return " ".join(text.lower().replace("’", "'").replace("‘", "'").split())
+
+
+class PhraseMatcher:
+    """
+    Finds the first of many phrases in a text in a single pass.
+
+    Literal phrases are compiled into an Aho-Corasick automaton, so matching
+    cost depends on the text length, not on the number of phrases. Entries
+    prefixed with "re:" are regular expressions, combined into one alternation
+    and checked only if no literal phrase matched. `search` returns the phrase
+    (or "re:" pattern) that matched, else None.
+    """
+
+    def __init__(self, phrases):
+        literals, patterns = [], []
+        for phrase in phrases:
+            if phrase.startswith("re:"):
+                patterns.append(phrase[3:].strip())
+            else:
+                literals.append(normalize_text(phrase))
+
+        self.phrases = list(phrases)
+        self._build_automaton([p for p in literals if p])
+        # Texts are matched lowercased, so patterns ignore case (lowercasing them would break \S, \W, ...)
+        self._patterns = [(p, re.compile(p, re.IGNORECASE)) for p in patterns]
+        self._regex = re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE) if patterns else None
+
+    def _build_automaton(self, literals):
+        goto, fail, out = [{}], [0], [None]
+        for phrase in literals:
+            node = 0
+            for ch in phrase:
+                if ch not in goto[node]:
+                    goto.append({})
+                    fail.append(0)
+                    out.append(None)
+                    goto[node][ch] = len(goto) - 1
+                node = goto[node][ch]
+            out[node] = out[node] or phrase
+
+        # Breadth-first fail links; each node inherits the output of its fail node
+        queue = list(goto[0].values())
+        for node in queue:
+            for ch, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(ch, 0)
+                out[child] = out[child] or out[fail[child]]
+
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def search(self, text: str):
+        text = normalize_text(text)
+        goto, fail, out = self._goto, self._fail, self._out
+
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                return out[node]
+
+        if self._regex and self._regex.search(text):
+            # Identify which pattern matched only on the (rare) hit path
+            return next(f"re:{p}" for p, rx in self._patterns if rx.search(text))
+        return None
+
+    @classmethod
+    def from_file(cls, path: str, default=()):
+        """One phrase per line; blank lines and lines starting with # are ignored."""
+        if not os.path.exists(path):
+            return cls(default)
+        with open(path, encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+        return cls([line for line in lines if line and not line.startswith("#")])
+
+
+class ReloadingPhraseMatcher:
+    """
+    PhraseMatcher backed by a file that is rebuilt when the file changes.
+    The mtime is checked at most every `check_interval` seconds, and the
+    new automaton is swapped in atomically so readers never see a partial one.
+    """
+
+    def __init__(self, path: str, default=(), check_interval: float = 5):
+        self.path = path
+        self.default = default
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0
+        self.reload()
+
+    def _file_mtime(self):
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def reload(self):
+        with self._lock:
+            mtime = self._file_mtime()
+            self.matcher = PhraseMatcher.from_file(self.path, self.default)
+            self._mtime = mtime
+            self._next_check = time.monotonic() + self.check_interval
+        return len(self.matcher.phrases)
+
+    def search(self, text: str):
+        if self.check_interval and time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.check_interval
+            if self._file_mtime() != self._mtime:
+                try:
+                    self.reload()
+                except Exception:  # e.g. a bad "re:" line; keep the last good list
+                    logger.exception("Failed to reload %s", self.path)
+        return self.matcher.search(text)
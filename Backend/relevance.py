@@ -0,0 +1,98 @@
+import os, re, zlib
+import numpy as np
+
+N_FEATURES = 2 ** 16
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+_token_re = re.compile(r"[a-z0-9']+")
+
+
+def extract_features(text: str) -> list:
+    """Word unigrams, bigrams and character 3-5-grams of each word."""
+    tokens = _token_re.findall(text.lower().replace("’", "'"))
+    feats = [f"w:{t}" for t in tokens]
+    feats += [f"b:{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    for t in tokens:
+        padded = f"<{t}>"
+        feats += [f"c:{padded[i:i + n]}" for n in (3, 4, 5) for i in range(len(padded) - n + 1)]
+    return feats
+
+
+def vectorize(texts: list):
+    """
+    Hash features of a batch into sparse COO arrays (rows, cols, vals).
+    crc32 keeps the hashing stable across processes, unlike hash().
+    Each row is L2-normalised so long messages don't dominate.
+    """
+    rows, cols, vals = [], [], []
+    for i, text in enumerate(texts):
+        hashed = {}
+        for feat in extract_features(text):
+            h = zlib.crc32(feat.encode("utf-8")) % N_FEATURES
+            hashed[h] = hashed.get(h, 0) + 1.0
+        norm = np.sqrt(sum(v * v for v in hashed.values())) or 1.0
+        for h, v in hashed.items():
+            rows.append(i)
+            cols.append(h)
+            vals.append(v / norm)
+    return (
+        np.asarray(rows, dtype=np.int64),
+        np.asarray(cols, dtype=np.int64),
+        np.asarray(vals, dtype=np.float32),
+    )
+
+
+class RelevanceClassifier:
+    """
+    Logistic regression over hashed n-gram features. `scores` returns, for a
+    whole batch at once, the probability that each message is on-topic for a
+    wellbeing conversation (1.0) rather than an unrelated request (0.0).
+    """
+
+    def __init__(self, weights: np.ndarray, bias: float, threshold: float = 0.5):
+        self.weights = weights
+        self.bias = bias
+        self.threshold = threshold
+
+    def scores(self, texts: list) -> np.ndarray:
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        rows, cols, vals = vectorize(texts)
+        logits = np.bincount(rows, weights=self.weights[cols] * vals, minlength=len(texts)) + self.bias
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def is_relevant(self, texts: list) -> np.ndarray:
+        return self.scores(texts) >= self.threshold
+
+    @classmethod
+    def train(cls, texts: list, labels: list, epochs: int = 300, lr: float = 2.0, l2: float = 1e-4, threshold: float = 0.5):
+        """Full-batch gradient descent; the data set is small enough to fit in one step."""
+        rows, cols, vals = vectorize(texts)
+        y = np.asarray(labels, dtype=np.float64)
+        n = len(texts)
+        weights = np.zeros(N_FEATURES, dtype=np.float64)
+        bias = 0.0
+
+        for _ in range(epochs):
+            logits = np.bincount(rows, weights=weights[cols] * vals, minlength=n) + bias
+            error = 1.0 / (1.0 + np.exp(-logits)) - y
+            grad = np.zeros(N_FEATURES, dtype=np.float64)
+            np.add.at(grad, cols, error[rows] * vals)
+            weights -= lr * (grad / n + l2 * weights)
+            bias -= lr * error.mean()
+
+        return cls(weights.astype(np.float32), float(bias), threshold)
+
+
+def load_labelled(path: str):
+    """Read a `label<TAB>text` file, skipping blank and # lines."""
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            label, text = line.split("\t", 1)
+            texts.append(text)
+            labels.append(int(label))
+    return texts, labels
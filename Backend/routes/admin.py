@@ -1,17 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Literal, Optional
 from datetime import datetime, timedelta
 from models import *
-from extensions import get_db
-from auth import get_current_user, require_role
+from extensions import get_db, AsyncSessionLocal
+from auth import get_current_user, require_role, invalidate_user
+from utils import emotion_cache, emotion_pool, crisis_matcher
+from search import search_messages, search_supported
+from persister import settle
+from routes.chat import chat_latency, context_cache
 from pydantic import BaseModel, EmailStr
 import pytz
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from config import EXPORT_CHUNK_ROWS, BULK_CHUNK_USERS
+from schema import BulkUserRequest, BulkDeleteRequest
+import asyncio, csv, io, json, logging, uuid, zlib
 
 ist = pytz.timezone("Asia/Kolkata")
 now = datetime.now(ist)
+logger = logging.getLogger(__name__)
 
 admin_router = APIRouter(
     prefix="/api/v1/admin",
@@ -19,8 +29,8 @@ admin_router = APIRouter(
 )
 
 @admin_router.get("/dashboard")
-def admin_dashboard(user_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    admin = db.query(User).filter(User.user_id == user_id).first()
+async def admin_dashboard(user_id: int, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    admin = await db.scalar(select(User).where(User.user_id == user_id))
     if not admin:
         raise HTTPException(status_code=404, detail="admin not found")
     
@@ -28,67 +38,272 @@ def admin_dashboard(user_id: int, db: Session = Depends(get_db), user=Depends(ge
         "full_name": admin.user.full_name,
     }
 
+STATS_WINDOWS = {"5m": 300, "15m": 900, "1h": 3600, "6h": 21600, "24h": 86400}
+
 @admin_router.get("/stats")
-def get_admin_stats(db: Session = Depends(get_db)):
+async def get_admin_stats(window: Literal["5m", "15m", "1h", "6h", "24h"] = "1h", db: AsyncSession = Depends(get_db)):
     # Total users
-    total_users = db.query(User).count() - 1
+    total_users = await db.scalar(select(func.count(User.id))) - 1
 
     # Active sessions → users logged in within last 10 minutes
     ten_min_ago = datetime.now(ist) - timedelta(minutes=10)
-    active_sessions = db.query(Login).filter(Login.last_login >= ten_min_ago).count() -1 
+    active_sessions = await db.scalar(select(func.count(Login.id)).where(Login.last_login >= ten_min_ago)) -1 
 
-    # Avg response time → dummy value for now
-    avg_response_time = "2.3s"
+    # Chat latency over the window, from the rolling per-minute histograms
+    latency = chat_latency.summary(STATS_WINDOWS[window])
+    total = latency.get("total")
+    avg_response_time = f"{total['avg_ms'] / 1000:.1f}s" if total else "N/A"
 
-    # User satisfaction → dummy or fetch from feedback table if exists
-    user_satisfaction = "94%"
+    # User satisfaction → no feedback is collected yet
+    user_satisfaction = "N/A"
 
     return {
         "total_users": total_users,
         "active_sessions": active_sessions,
         "avg_response_time": avg_response_time,
         "user_satisfaction": user_satisfaction,
+        "window": window,
+        "latency": latency,
     }
 
+@admin_router.get("/emotion_cache")
+def get_emotion_cache_stats(current_user=Depends(get_current_user)):
+    if current_user["role_id"] != 1:
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    return emotion_cache.stats()
+
+@admin_router.get("/emotion_workers")
+def get_emotion_worker_stats(current_user=Depends(get_current_user)):
+    if current_user["role_id"] != 1:
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    return emotion_pool.stats() if emotion_pool else {"workers": 0, "running": False}
+
+@admin_router.post("/crisis_phrases/reload")
+def reload_crisis_phrases(current_user=Depends(get_current_user)):
+    if current_user["role_id"] != 1:
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    try:
+        count = crisis_matcher.reload()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid crisis phrase file: {str(e)}")
+    return {"message": f"Loaded {count} crisis phrases."}
+
 @admin_router.patch("/{user_id}/block_user")
-def block_user(user_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def block_user(user_id: int, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    user = await db.scalar(select(User).options(joinedload(User.login)).where(User.id == user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     user.user_status = UserStatus.suspended
-    db.commit()
+    await db.commit()
+    if user.login:
+        invalidate_user(user.login.username)
     return {"message": f"User {user_id} has been blocked."}
 
 @admin_router.patch("/{user_id}/unblock_user")
-def unblock_user(user_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def unblock_user(user_id: int, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    user = await db.scalar(select(User).options(joinedload(User.login)).where(User.id == user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     user.user_status = UserStatus.active
-    db.commit()
+    await db.commit()
+    if user.login:
+        invalidate_user(user.login.username)
     return {"message": f"User {user_id} has been unblocked."}
 
 @admin_router.delete("/{user_id}/delete_user")
-def delete_user(user_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    if not await db.scalar(select(User.id).where(User.id == user_id)):
         raise HTTPException(status_code=404, detail="User not found")
-    db.delete(user)
-    db.commit()
+    role = await db.scalar(select(Role.name).join(Login, Login.role_id == Role.id).where(Login.user_id == user_id))
+    if role == RoleEnum.admin:
+        raise HTTPException(status_code=403, detail="Admin accounts can't be deleted")
+
+    await db.rollback()
+    await delete_users(db, [user_id])
     return {"message": f"User {user_id} has been deleted."}
 
+# 🔹 Bulk user actions: one statement per table for each chunk of users
+def bulk_targets(body: BulkUserRequest):
+    """Ids of the regular (non-admin) users selected by `body`."""
+    if body.user_ids is None and not (body.status or body.created_before or body.inactive_since):
+        raise HTTPException(status_code=400, detail="Give user_ids or at least one filter")
+
+    query = (
+        select(User.id)
+        .join(Login, Login.user_id == User.id)
+        .join(Role, Login.role_id == Role.id)
+        .where(Role.name == RoleEnum.user)
+    )
+    if body.user_ids is not None:
+        query = query.where(User.id.in_(body.user_ids))
+    if body.status:
+        query = query.where(User.user_status == body.status)
+    if body.created_before:
+        query = query.where(User.created_at < body.created_before)
+    if body.inactive_since:
+        query = query.where(or_(Login.last_login < body.inactive_since, Login.last_login.is_(None)))
+    return query.order_by(User.id)
+
+def chunked(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+# The ORM needn't find affected objects in the session: handlers don't keep any around
+BULK = {"synchronize_session": False}
+
+async def set_user_status(db: AsyncSession, body: BulkUserRequest, status: UserStatus) -> dict:
+    ids = (await db.scalars(bulk_targets(body))).all()
+    updated = 0
+    for chunk in chunked(ids, BULK_CHUNK_USERS):
+        usernames = (await db.scalars(select(Login.username).where(Login.user_id.in_(chunk)))).all()
+        result = await db.execute(
+            update(User).where(User.id.in_(chunk), User.user_status != status).values(user_status=status),
+            execution_options=BULK,
+        )
+        await db.commit()
+        updated += result.rowcount
+        for username in usernames:
+            invalidate_user(username)
+    return {"matched": len(ids), "updated": updated}
+
+async def delete_users(db: AsyncSession, ids: list, job: dict = None) -> int:
+    """
+    Delete the users and their logins, support requests, sessions and
+    messages, BULK_CHUNK_USERS users per transaction. Returns users deleted.
+
+    Chat turns of these sessions may still be queued, or be committed by a
+    request that already loaded the session, after its DELETE (SQLite
+    doesn't enforce the foreign key). So the sessions are dropped from the
+    context cache first, and once the delete commits, pending writes are
+    settled and their messages swept.
+    """
+    deleted = 0
+    for chunk in chunked(ids, BULK_CHUNK_USERS):
+        usernames = (await db.scalars(select(Login.username).where(Login.user_id.in_(chunk)))).all()
+        sessions = (await db.execute(
+            select(ChatSession.id, ChatSession.session_uuid).where(ChatSession.user_id.in_(chunk))
+        )).all()
+        for _, session_uuid in sessions:
+            context_cache.invalidate(session_uuid)
+
+        of_users = ChatSession.user_id.in_(chunk)
+        for statement in (
+            delete(ChatMessage).where(ChatMessage.session_id.in_(select(ChatSession.id).where(of_users))),
+            delete(ChatSession).where(of_users),
+            delete(Support_Request).where(Support_Request.user_id.in_(chunk)),
+            delete(Login).where(Login.user_id.in_(chunk)),
+        ):
+            await db.execute(statement, execution_options=BULK)
+        result = await db.execute(delete(User).where(User.id.in_(chunk)), execution_options=BULK)
+        await db.commit()
+        deleted += result.rowcount
+
+        for username in usernames:
+            invalidate_user(username)
+        if sessions:
+            session_ids = [session_id for session_id, _ in sessions]
+            for _, session_uuid in sessions:  # a request may have cached one again meanwhile
+                context_cache.invalidate(session_uuid)
+            await settle()
+            await db.execute(delete(ChatMessage).where(ChatMessage.session_id.in_(session_ids)), execution_options=BULK)
+            await db.commit()
+        if job:
+            job["processed"] += len(chunk)
+            job["deleted"] = deleted
+    return deleted
+
+# Background bulk deletes, by job id. Kept in this worker's memory only:
+# poll the worker that accepted the job, and a restart forgets it
+bulk_jobs = {}
+bulk_job_tasks = set()
+MAX_BULK_JOBS = 100
+
+async def run_delete_job(job: dict, ids: list):
+    try:
+        async with AsyncSessionLocal() as db:
+            await delete_users(db, ids, job)
+        job["status"] = "done"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+        logger.exception("Bulk delete job %s failed", job["id"])
+    finally:
+        job["finished_at"] = datetime.now(ist).isoformat()
+
+def start_delete_job(ids: list) -> dict:
+    job = {
+        "id": str(uuid.uuid4()), "action": "delete", "status": "running",
+        "total": len(ids), "processed": 0, "deleted": 0, "error": None,
+        "started_at": datetime.now(ist).isoformat(), "finished_at": None,
+    }
+    finished = [job_id for job_id, old in bulk_jobs.items() if old["status"] != "running"]
+    for job_id in finished[:max(0, len(bulk_jobs) + 1 - MAX_BULK_JOBS)]:
+        del bulk_jobs[job_id]
+    bulk_jobs[job["id"]] = job
+
+    task = asyncio.get_running_loop().create_task(run_delete_job(job, ids))
+    bulk_job_tasks.add(task)
+    task.add_done_callback(bulk_job_tasks.discard)
+    return job
+
+@admin_router.patch("/users/bulk_block")
+async def bulk_block_users(body: BulkUserRequest, db: AsyncSession = Depends(get_db), current_user=Depends(get_current_user)):
+    # Ensure admin role
+    if current_user["role_id"] != 1:
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    return await set_user_status(db, body, UserStatus.suspended)
+
+@admin_router.patch("/users/bulk_unblock")
+async def bulk_unblock_users(body: BulkUserRequest, db: AsyncSession = Depends(get_db), current_user=Depends(get_current_user)):
+    # Ensure admin role
+    if current_user["role_id"] != 1:
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    return await set_user_status(db, body, UserStatus.active)
+
+@admin_router.post("/users/bulk_delete")
+async def bulk_delete_users(body: BulkDeleteRequest, db: AsyncSession = Depends(get_db), current_user=Depends(get_current_user)):
+    """
+    Delete the selected users with everything they own. With background=true
+    the response is 202 with a job to poll at /users/bulk_jobs/{job_id}.
+    """
+    # Ensure admin role
+    if current_user["role_id"] != 1:
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    ids = (await db.scalars(bulk_targets(body))).all()
+    await db.rollback()
+
+    if body.background:
+        return JSONResponse(status_code=202, content=start_delete_job(ids))
+    return {"matched": len(ids), "deleted": await delete_users(db, ids)}
+
+@admin_router.get("/users/bulk_jobs/{job_id}")
+async def get_bulk_job(job_id: str, current_user=Depends(get_current_user)):
+    # Ensure admin role
+    if current_user["role_id"] != 1:
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    job = bulk_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @admin_router.get("/users", response_model=List[BaseModel])
-def get_all_users(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    users = (
-        db.query(User)
+async def get_all_users(db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    users = (await db.scalars(
+        select(User)
         .join(Login, User.id == Login.user_id)
         .join(Role, Login.role_id == Role.id)
-        .filter(Role.name == RoleEnum.user)
+        .where(Role.name == RoleEnum.user)
         .options(joinedload(User.login).joinedload(Login.role))
-        .all()
-    )
+    )).all()
 
     formatted_users = []
     for u in users:
@@ -107,12 +322,12 @@ def get_all_users(db: Session = Depends(get_db), user=Depends(get_current_user))
     return JSONResponse(content=jsonable_encoder(formatted_users))    
 
 @admin_router.get("/support_requests", response_model=List[BaseModel])
-def get_support_requests(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    requests = db.query(Support_Request).all()
+async def get_support_requests(db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    requests = (await db.scalars(select(Support_Request))).all()
     return JSONResponse(content=jsonable_encoder(requests))
 
 # @admin_router.post("/respond_support_request/{request_id}")
-# def respond_support_request(request_id: int, response: str = Body(...), db: Session = Depends(get_db), user=Depends(get_current_user)):
+# def respond_support_request(request_id: int, response: str = Body(...), db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
 #     support_request = db.query(Support_Request).filter(Support_Request.id == request_id).first()
 #     if not support_request:
 #         raise HTTPException(status_code=404, detail="Support request not found")
@@ -127,67 +342,236 @@ def get_support_requests(db: Session = Depends(get_db), user=Depends(get_current
 #     return {"message": "Response sent successfully."}
 
 @admin_router.patch("/support_request/{request_id}/mark_resolved")
-def close_support_request(request_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    support_request = db.query(Support_Request).filter(Support_Request.id == request_id).first()
+async def close_support_request(request_id: int, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    support_request = await db.scalar(select(Support_Request).where(Support_Request.id == request_id))
     if not support_request:
         raise HTTPException(status_code=404, detail="Support request not found")
     
     support_request.status = "resolved"
-    db.commit()
+    await db.commit()
     return {"message": "Support request closed successfully."}
 
+def session_filters(user_id=None, date_from=None, date_to=None, has_crisis=None, emotion=None) -> list:
+    """WHERE clauses on ChatSession for the admin session filters (dates are on last activity)."""
+    filters = []
+    if user_id is not None:
+        filters.append(ChatSession.user_id == user_id)
+    if date_from:
+        filters.append(ChatSession.last_message_at >= date_from)
+    if date_to:
+        filters.append(ChatSession.last_message_at <= date_to)
+    if has_crisis is not None:
+        filters.append(ChatSession.has_crisis == has_crisis)
+    if emotion:
+        filters.append(ChatSession.id.in_(
+            select(ChatMessage.session_id).where(ChatMessage.emotion == emotion)))
+    return filters
+
 @admin_router.get("/chat/sessions")
-def admin_get_all_sessions(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+async def admin_get_all_sessions(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    order: Literal["asc", "desc"] = "desc",
+    user_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    has_crisis: Optional[bool] = None,
+    emotion: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    One page of sessions by last activity. Filters apply in SQL and the
+    date range is on last activity; `total` counts all matching sessions.
+    """
     # Ensure admin role
     if current_user["role_id"] != 1:
         raise HTTPException(status_code=403, detail="Admins only")
 
-    sessions = (
-        db.query(ChatSession, User)
-        .join(User, ChatSession.user_id == User.id)
-        .all()
-    )
+    await settle()
+    filters = session_filters(user_id, date_from, date_to, has_crisis, emotion)
 
-    result = []
-    for session, user in sessions:
-        last_msg = (
-            db.query(ChatMessage)
-            .filter(ChatMessage.session_id == session.id)
-            .order_by(ChatMessage.created_at.desc())
-            .first()
+    total = await db.scalar(
+        select(func.count(ChatSession.id)).join(User, ChatSession.user_id == User.id).where(*filters))
+
+    sort = ChatSession.last_message_at.desc() if order == "desc" else ChatSession.last_message_at.asc()
+    tiebreak = ChatSession.id.desc() if order == "desc" else ChatSession.id.asc()
+    rows = (await db.execute(
+        select(
+            ChatSession.session_uuid, ChatSession.title, ChatSession.created_at,
+            ChatSession.last_message_at, ChatSession.message_count, ChatSession.has_crisis,
+            User.id, User.first_name, User.last_name,
         )
+        .join(User, ChatSession.user_id == User.id)
+        .where(*filters)
+        .order_by(sort, tiebreak)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    )).all()
 
-        result.append({
-            "session_id": session.session_uuid,
-            "title": session.title or "New Conversation",
-            "user_id": user.id,
-            "user_name": f"{user.first_name} {user.last_name}",
-            "last_updated": (
-                last_msg.created_at.isoformat() if last_msg else session.created_at.isoformat()
-            ),
-        })
+    return {
+        "sessions": [
+            {
+                "session_id": row.session_uuid,
+                "title": row.title or "New Conversation",
+                "user_id": row.id,
+                "user_name": f"{row.first_name} {row.last_name}",
+                "last_updated": (row.last_message_at or row.created_at).isoformat(),
+                "message_count": row.message_count or 0,
+                "has_crisis": bool(row.has_crisis),
+            }
+            for row in rows
+        ],
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "has_more": page * page_size < total,
+    }
 
-    return result
 
+@admin_router.get("/chat/search")
+async def admin_search_messages(
+    q: str = Query(..., min_length=1, max_length=200),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    role: Optional[Literal["user", "bot"]] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Ranked full-text search over all chat messages; matches are [bracketed] in the snippet."""
+    # Ensure admin role
+    if current_user["role_id"] != 1:
+        raise HTTPException(status_code=403, detail="Admins only")
+    if not search_supported(db.get_bind()):
+        raise HTTPException(status_code=501, detail="Search is only available on SQLite")
+
+    await settle()
+    hits, total = await search_messages(db, q, limit=page_size, offset=(page - 1) * page_size, role=role)
+    return {
+        "results": [
+            {
+                "message_id": hit["id"],
+                "session_id": hit["session_uuid"],
+                "session_title": hit["title"] or "New Conversation",
+                "user_id": hit["user_id"],
+                "role": hit["role"],
+                "emotion": hit["emotion"],
+                "snippet": hit["snippet"],
+                "created_at": hit["created_at"].isoformat() if hit["created_at"] else None,
+                "score": -hit["rank"],  # bm25 is lower-is-better
+            }
+            for hit in hits
+        ],
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "has_more": page * page_size < total,
+    }
+
+EXPORT_COLUMNS = ("session_id", "session_title", "user_id", "has_crisis",
+                  "message_id", "role", "emotion", "content", "created_at")
+
+async def export_chunks(filters: list):
+    """
+    Messages of the matching sessions in id order, EXPORT_CHUNK_ROWS at a time.
+    Each chunk is a short keyset query in its own read transaction, so memory
+    stays flat and a long export never holds the connection or a read lock.
+    """
+    last_id = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            rows = (await db.execute(
+                select(
+                    ChatSession.session_uuid, ChatSession.title, ChatSession.user_id, ChatSession.has_crisis,
+                    ChatMessage.id, ChatMessage.role, ChatMessage.emotion, ChatMessage.content, ChatMessage.created_at,
+                )
+                .join(ChatSession, ChatMessage.session_id == ChatSession.id)
+                .where(ChatMessage.id > last_id, *filters)
+                .order_by(ChatMessage.id)
+                .limit(EXPORT_CHUNK_ROWS)
+            )).all()
+            await db.rollback()
+            if rows:
+                yield [
+                    (row.session_uuid, row.title, row.user_id, bool(row.has_crisis), row.id, row.role,
+                     row.emotion, row.content, row.created_at.isoformat() if row.created_at else None)
+                    for row in rows
+                ]
+            if len(rows) < EXPORT_CHUNK_ROWS:
+                return
+            last_id = rows[-1].id
+
+def ndjson_chunk(rows: list) -> str:
+    return "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows)
+
+def csv_chunk(rows: list, header: bool = False) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(rows)
+    return out.getvalue()
+
+@admin_router.get("/chat/export")
+async def admin_export_chats(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    compress: bool = Query(False, alias="gzip"),
+    user_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    has_crisis: Optional[bool] = None,
+    emotion: Optional[str] = None,
+    current_user=Depends(get_current_user),
+):
+    """
+    Stream every message of the matching sessions (same filters as
+    /chat/sessions) as NDJSON or CSV, one row per message with its session's
+    fields, optionally gzipped. Memory use doesn't grow with the export size.
+    """
+    # Ensure admin role
+    if current_user["role_id"] != 1:
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    await settle()
+    filters = session_filters(user_id, date_from, date_to, has_crisis, emotion)
+
+    async def body():
+        gz = zlib.compressobj(wbits=31) if compress else None  # 31: gzip container
+        if export_format == "csv":  # a header even when nothing matches
+            chunk = csv_chunk([], header=True).encode()
+            yield gz.compress(chunk) if gz else chunk
+        async for rows in export_chunks(filters):
+            chunk = (csv_chunk(rows) if export_format == "csv" else ndjson_chunk(rows)).encode()
+            chunk = gz.compress(chunk) if gz else chunk
+            if chunk:  # zlib holds back output until it has a full block
+                yield chunk
+        if gz:
+            yield gz.flush()
+
+    filename = f"chat_export_{datetime.now(ist):%Y%m%d_%H%M%S}.{export_format}" + (".gz" if compress else "")
+    media_type = "application/gzip" if compress else (
+        "text/csv; charset=utf-8" if export_format == "csv" else "application/x-ndjson")
+    return StreamingResponse(body(), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
 
 @admin_router.get("/chat/messages/{session_id}")
-def admin_get_chat_messages(session_id: str, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+async def admin_get_chat_messages(session_id: str, db: AsyncSession = Depends(get_db), current_user=Depends(get_current_user)):
     # Ensure admin role
     if current_user["role_id"] != 1:
         raise HTTPException(status_code=403, detail="Admins only")
 
-    session = db.query(ChatSession).filter(
-        ChatSession.session_uuid == session_id).first()
+    session = await db.scalar(select(ChatSession).where(
+        ChatSession.session_uuid == session_id))
 
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+    await settle(session.id)
 
-    messages = (
-        db.query(ChatMessage)
-        .filter(ChatMessage.session_id == session.id)
+    messages = (await db.scalars(
+        select(ChatMessage)
+        .where(ChatMessage.session_id == session.id)
         .order_by(ChatMessage.created_at)
-        .all()
-    )
+    )).all()
 
     return messages
 
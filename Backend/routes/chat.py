@@ -1,116 +1,309 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-import google.generativeai as genai
-from dotenv import load_dotenv
-import os, uuid
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import cache
+from typing import Literal, Optional
+import anyio, asyncio, json, logging, time, uuid
 from datetime import datetime
-from extensions import get_db
-from models import ChatSession, ChatMessage, User
+from config import (
+    GEMINI_API_KEY, LLM_MODEL_NAME, LLM_MAX_CONCURRENCY, LLM_PROVIDER, LLM_TIMEOUT, LLM_RETRIES,
+    LLM_RETRY_BACKOFF, LLM_HEDGE_AFTER, LLM_OFFLINE_LATENCY, LLM_OFFLINE_TOKENS_PER_S, LATENCY_RETENTION_MINUTES,
+    CONTEXT_CACHE_SIZE, CONTEXT_CACHE_TTL, CONTEXT_WINDOW, PROMPT_CONTEXT_TOKENS, PROMPT_MESSAGE_TOKENS,
+    PROMPT_INPUT_TOKENS, SUMMARY_TOKENS, SUMMARY_AFTER, SUMMARY_MAX_CONCURRENCY, CHAT_PERSIST_MODE,
+)
+from extensions import get_db, AsyncSessionLocal
+from models import ChatSession, ChatMessage, User, record_messages
 from schema import ChatRequest, ChatSessionOut
 from utils import *
 from auth import get_current_user
-
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from cache import TTLCache
+from latency import LatencyRecorder
+from llm import LLMError, LLMTimeout, ResilientLLM, make_provider
+from metrics import LLM_IN_FLIGHT, LLM_WAITING
+from tokens import estimate_tokens, truncate_tokens
+from persister import PendingTurn, queue_turn, settle
 
 chat_router = APIRouter(prefix="/chat", tags=["Chatbot"])
-
-@chat_router.post("/")
-async def chat_with_gemini(request: ChatRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    user_text = request.user_message.strip()
-    if not user_text:
-        raise HTTPException(status_code=400, detail="Empty message not allowed")
-
-    # 🔹 Get or create chat session
-    if request.session_id:
-        session_obj = db.query(ChatSession).filter_by(session_uuid=request.session_id).first()
-        if not session_obj:
-            raise HTTPException(status_code=404, detail="Session not found")
-    else:
-        session_uuid = str(uuid.uuid4())
-        session_obj = ChatSession(
-            user_id=current_user['id'],
-            session_uuid=session_uuid,
-            created_at=datetime.utcnow(),
-            title=None  # title will be generated later
-        )
-        db.add(session_obj)
-        db.commit()
-        db.refresh(session_obj)
-
-    session_id = session_obj.session_uuid
+logger = logging.getLogger(__name__)
+
+# Caps concurrent Gemini calls so a burst of chats can't exhaust the threadpool
+llm_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+# Per-stage latency of chat requests, aggregated per minute for /admin/stats
+chat_latency = LatencyRecorder(LATENCY_RETENTION_MINUTES)
+
+IRRELEVANT_REPLY = (
+    "I may not be able to help with recipes, technical tasks, or unrelated topics, "
+    "but I'm here to support your emotional well-being. "
+    "How are you feeling today?"
+)
+
+CRISIS_REPLY = (
+    "It sounds like you're going through a really hard time. "
+    "You’re not alone. Please consider calling someone you trust or "
+    "a helpline like AASRA (91-9820466726). "
+    "I’m here with you. Would you like some breathing or grounding exercises?"
+)
+
+# What the client is told when a reply fails; details stay in the server logs
+LLM_TIMEOUT_DETAIL = "The assistant took too long to reply, please try again."
+LLM_UNAVAILABLE_DETAIL = "The assistant is unavailable right now, please try again."
+CHAT_ERROR_DETAIL = "Something went wrong while replying, please try again."
+
+tone_map = {
+    "joy": "Be cheerful and encouraging.",
+    "sadness": "Be warm, empathetic, and gentle.",
+    "anger": "Stay calm, understanding, and patient.",
+    "fear": "Be reassuring and comforting.",
+    "neutral": "Be supportive and kind.",
+}
+
+def canned_reply(user_text: str):
+    """Return (reply, title) for messages answered without the LLM, else None."""
+    # 🔹 Detect distress first, so a crisis message is never dismissed as off-topic
+    if detect_distress(user_text):
+        return CRISIS_REPLY, None
 
     if is_irrelevant_query(user_text):
-        bot_reply = (
-            "I may not be able to help with recipes, technical tasks, or unrelated topics, "
-            "but I'm here to support your emotional well-being. "
-            "How are you feeling today?"
-        )
+        return IRRELEVANT_REPLY, "Conversation"
 
-        db.add_all([
-            ChatMessage(session_id=session_obj.id, role="user", content=user_text),
-            ChatMessage(session_id=session_obj.id, role="bot", content=bot_reply)
-        ])
+    return None
 
-        if not session_obj.title:
-            session_obj.title = "Conversation"
-            db.add(session_obj)
+def backfill_crisis_flags(bind):
+    """Flag sessions where the crisis reply was sent before has_crisis existed."""
+    crisis_sessions = select(ChatMessage.session_id).where(
+        ChatMessage.role == "bot", ChatMessage.content == CRISIS_REPLY)
+    with bind.begin() as conn:
+        conn.execute(ChatSession.__table__.update()
+                     .where(ChatSession.id.in_(crisis_sessions)).values(has_crisis=True))
 
-        db.commit()
-
-        return {
-            "session_id": session_id,
-            "reply": bot_reply,
-            "title": session_obj.title
-        }
+async def get_or_create_session(db: AsyncSession, session_id, user_id):
+    if session_id:
+        session_obj = await db.scalar(select(ChatSession).where(ChatSession.session_uuid == session_id))
+        if not session_obj:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return session_obj
+
+    session_obj = ChatSession(
+        user_id=user_id,
+        session_uuid=str(uuid.uuid4()),
+        created_at=datetime.utcnow(),
+        title=None  # title will be generated later
+    )
+    db.add(session_obj)
+    await db.commit()
+    return session_obj
+
+class SessionContext:
+    """
+    What a chat turn needs to know about its session: ids, title, the rolling
+    summary and the last few messages as (id, role, content), oldest first.
+    A message queued for a batched write has no id yet (None).
+    """
+    __slots__ = ("id", "session_uuid", "title", "summary", "summary_message_id", "unsummarized", "messages")
+
+    def __init__(self, id: int, session_uuid: str, title=None, summary=None, summary_message_id=None,
+                 unsummarized: int = 0, messages=()):
+        self.id = id
+        self.session_uuid = session_uuid
+        self.title = title
+        self.summary = summary
+        self.summary_message_id = summary_message_id
+        self.unsummarized = unsummarized  # messages newer than the summary
+        self.messages = deque(messages, maxlen=CONTEXT_WINDOW)
+
+    def render(self, budget: int = PROMPT_CONTEXT_TOKENS) -> str:
+        """The summary, then as many of the newest messages as fit in `budget` tokens."""
+        header = f"Summary of earlier conversation: {self.summary}" if self.summary else ""
+        budget -= estimate_tokens(header)
+        lines = []
+        for id, role, content in reversed(self.messages):
+            if self.summary_message_id and id is not None and id <= self.summary_message_id:
+                break
+            line = f"{role.capitalize()}: {truncate_tokens(content, PROMPT_MESSAGE_TOKENS)}"
+            cost = estimate_tokens(line)
+            if cost > budget:
+                break
+            lines.append(line)
+            budget -= cost
+        return "\n".join(([header] if header else []) + lines[::-1])
+
+# Write-through: save_turn appends to the cached window, so an active
+# conversation builds its prompt without reading the database
+context_cache = TTLCache(CONTEXT_CACHE_SIZE, CONTEXT_CACHE_TTL)
+
+async def get_recent_messages(db: AsyncSession, session_id: int, limit: int = CONTEXT_WINDOW) -> list:
+    last_msgs = (await db.execute(
+        select(ChatMessage.id, ChatMessage.role, ChatMessage.content)
+        .where(ChatMessage.session_id == session_id)
+        .order_by(ChatMessage.id.desc()).limit(limit)
+    )).all()
+    return [(m.id, m.role, m.content) for m in reversed(last_msgs)]
+
+async def load_session_context(db: AsyncSession, session_id, user_id) -> SessionContext:
+    session_obj = await get_or_create_session(db, session_id, user_id)
+    ctx = SessionContext(session_obj.id, session_obj.session_uuid, session_obj.title,
+                         session_obj.summary, session_obj.summary_message_id)
+    if session_id:
+        if await settle(session_obj.id):  # queued turns may have set the title
+            await db.refresh(session_obj)
+            ctx.title = session_obj.title
+        ctx.messages.extend(await get_recent_messages(db, session_obj.id))
+        ctx.unsummarized = await db.scalar(select(func.count(ChatMessage.id)).where(
+            ChatMessage.session_id == session_obj.id,
+            ChatMessage.id > (session_obj.summary_message_id or 0),
+        ))
+    context_cache.set(ctx.session_uuid, ctx)
+    return ctx
+
+async def get_session_context(db: AsyncSession, session_id, user_id) -> SessionContext:
+    ctx = context_cache.get(session_id) if session_id else None
+    if ctx is None:
+        ctx = await load_session_context(db, session_id, user_id)
+    return ctx
+
+async def commit_turn(db: AsyncSession, ctx: SessionContext, user_text: str, bot_reply: str,
+                      emotion=None, title=None):
+    user_msg = ChatMessage(session_id=ctx.id, role="user", content=user_text, emotion=emotion)
+    bot_msg = ChatMessage(session_id=ctx.id, role="bot", content=bot_reply)
+    db.add_all([user_msg, bot_msg])
+    await db.flush()
+    ids = (user_msg.id, bot_msg.id)
+    await record_messages(db, ctx.id, 2, crisis=bot_reply == CRISIS_REPLY)
+
+    # 🔹 Generate title if it's first message
+    if not ctx.title:
+        new_title = title or bot_reply[:50]
+        updated = await db.execute(update(ChatSession)
+                                   .where(ChatSession.id == ctx.id, ChatSession.title.is_(None))
+                                   .values(title=new_title))
+        ctx.title = new_title if updated.rowcount else await db.scalar(
+            select(ChatSession.title).where(ChatSession.id == ctx.id))
+
+    await db.commit()
+    return ids
+
+async def queue_turn_write(ctx: SessionContext, user_text: str, bot_reply: str, emotion=None, title=None):
+    """
+    Returns (ids, title). The cached ctx.title is only set once the write
+    commits, so after a failed batch the next turn sends the title again.
+    """
+    new_title = None if ctx.title else title or bot_reply[:50]
+    write = queue_turn(PendingTurn(ctx.id, [
+        {"role": "user", "content": user_text, "emotion": emotion},
+        {"role": "bot", "content": bot_reply, "emotion": None},
+    ], crisis=bot_reply == CRISIS_REPLY, title=new_title))
+
+    if CHAT_PERSIST_MODE == "group":
+        await asyncio.shield(write)  # a disconnecting client doesn't cancel the batch
+        ctx.title = ctx.title or new_title
+    elif new_title:
+        def keep_title(done):
+            if not done.cancelled() and done.exception() is None:
+                ctx.title = ctx.title or new_title
+        write.add_done_callback(keep_title)
+    return (None, None), ctx.title or new_title
+
+async def save_turn(db: AsyncSession, ctx: SessionContext, user_text: str, bot_reply: str,
+                    emotion=None, title=None):
+    if CHAT_PERSIST_MODE == "direct":
+        ids = await commit_turn(db, ctx, user_text, bot_reply, emotion, title)
+        title = ctx.title
+    else:
+        ids, title = await queue_turn_write(ctx, user_text, bot_reply, emotion, title)
+
+    ctx.messages.append((ids[0], "user", user_text))
+    ctx.messages.append((ids[1], "bot", bot_reply))
+    ctx.unsummarized += 2
+    context_cache.set(ctx.session_uuid, ctx)  # refreshes its idle timeout
+    return title
+
+async def persist_turn(db: AsyncSession, ctx: SessionContext, user_text: str, bot_reply: str,
+                       emotion=None, title=None):
+    """Save the turn, then fold older messages into the summary in the background if due."""
+    title = await save_turn(db, ctx, user_text, bot_reply, emotion, title)
+    schedule_summary(ctx)
+    return title
+
+# 🔹 Rolling summaries, updated off the request path
+SUMMARY_FOLD_LIMIT = 40  # messages folded per update; a longer backlog catches up over the next turns
+summary_slots = asyncio.Semaphore(SUMMARY_MAX_CONCURRENCY)
+summary_tasks = {}  # session id -> running update, so each session has at most one
+
+def build_summary_prompt(previous, messages) -> str:
+    transcript = "\n".join(
+        f"{role.capitalize()}: {truncate_tokens(content, PROMPT_MESSAGE_TOKENS)}" for _, role, content in messages)
+    return f"""
+    You keep notes for a compassionate mental wellness companion.
+    Update the summary of this conversation with the new messages. Keep the user's
+    main concerns, feelings, important facts about their life and anything they
+    asked to be remembered. Write plain text, at most {int(SUMMARY_TOKENS * 0.75)} words.
+
+    Summary so far: {previous or "(none)"}
+
+    New messages:
+    {transcript}
+    """
 
-    # 🔹 Detect distress
-    if detect_distress(user_text):
-        bot_reply = (
-            "It sounds like you're going through a really hard time. "
-            "You’re not alone. Please consider calling someone you trust or "
-            "a helpline like AASRA (91-9820466726). "
-            "I’m here with you. Would you like some breathing or grounding exercises?"
+async def summarize_session(session_id: int):
+    """
+    Fold the messages older than the verbatim window into the session summary.
+    Returns (summary, last folded message id, messages folded), or None if
+    there was nothing to fold or another update got there first.
+    """
+    await settle(session_id)
+    async with AsyncSessionLocal() as db:
+        session_obj = await db.get(ChatSession, session_id)
+        if not session_obj:
+            return None
+        previous, covered = session_obj.summary, session_obj.summary_message_id
+        messages = (await db.execute(
+            select(ChatMessage.id, ChatMessage.role, ChatMessage.content)
+            .where(ChatMessage.session_id == session_id, ChatMessage.id > (covered or 0))
+            .order_by(ChatMessage.id)
+        )).all()
+        older = messages[:-CONTEXT_WINDOW][:SUMMARY_FOLD_LIMIT] if len(messages) > CONTEXT_WINDOW else []
+        await db.rollback()  # don't hold the connection while the LLM works
+        if not older:
+            return None
+
+        reply = await run_in_threadpool(generate_reply, build_summary_prompt(previous, older))
+        summary = truncate_tokens(reply, SUMMARY_TOKENS)
+        last_id = older[-1].id
+        updated = await db.execute(
+            update(ChatSession)
+            .where(ChatSession.id == session_id,
+                   func.coalesce(ChatSession.summary_message_id, 0) == (covered or 0))
+            .values(summary=summary, summary_message_id=last_id)
         )
-
-        db.add_all([
-            ChatMessage(session_id=session_obj.id, role="user", content=user_text),
-            ChatMessage(session_id=session_obj.id, role="bot", content=bot_reply)
-        ])
-
-        # 🔹 Generate title if it's first message
-        if not session_obj.title:
-            session_obj.title = bot_reply[:50]
-            db.add(session_obj)
-
-        db.commit()
-
-        return {
-            "session_id": session_id,
-            "reply": bot_reply,
-            "title": session_obj.title
-        }
-
-    # 🔹 Detect emotion
-    emotion = detect_emotion(user_text)
-
-    # 🔹 Retrieve last messages for context
-    last_msgs = db.query(ChatMessage).filter_by(session_id=session_obj.id)\
-        .order_by(ChatMessage.created_at.desc()).limit(6).all()
-
-    context = "\n".join([f"{m.role.capitalize()}: {m.content}" for m in reversed(last_msgs)])
-
-    tone_map = {
-        "joy": "Be cheerful and encouraging.",
-        "sadness": "Be warm, empathetic, and gentle.",
-        "anger": "Stay calm, understanding, and patient.",
-        "fear": "Be reassuring and comforting.",
-        "neutral": "Be supportive and kind.",
-    }
-
+        await db.commit()
+        return (summary, last_id, len(older)) if updated.rowcount else None
+
+async def refresh_summary(ctx: SessionContext):
+    async with summary_slots:
+        try:
+            result = await timed("summary", summarize_session(ctx.id))
+        except Exception:
+            logger.exception("Summary update for session %s failed", ctx.id)
+            return
+    if result:
+        ctx.summary, ctx.summary_message_id, folded = result
+        ctx.unsummarized -= folded
+
+def schedule_summary(ctx: SessionContext):
+    if ctx.unsummarized <= CONTEXT_WINDOW + SUMMARY_AFTER or ctx.id in summary_tasks:
+        return
+    task = asyncio.get_running_loop().create_task(refresh_summary(ctx))
+    summary_tasks[ctx.id] = task
+    task.add_done_callback(lambda _: summary_tasks.pop(ctx.id, None))
+
+def build_prompt(user_text: str, emotion: str, context: str) -> str:
     tone_instruction = tone_map.get(emotion, "Be empathetic and friendly.")
 
-    prompt = f"""
+    return f"""
     You are a compassionate mental wellness companion.
     Avoid diagnosing or prescribing medication.
     Encourage reflection, self-care, and seeking professional help when necessary.
@@ -119,64 +312,249 @@ async def chat_with_gemini(request: ChatRequest, db: Session = Depends(get_db),
     Recent conversation:
     {context}
 
-    User ({emotion}): {user_text}
+    User ({emotion}): {truncate_tokens(user_text, PROMPT_INPUT_TOKENS)}
     """
 
-    # 🔹 Generate stop-safe reply
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    response = model.generate_content(prompt)
-    bot_reply = response.text.strip()
+@cache
+def get_llm() -> ResilientLLM:
+    provider = make_provider(
+        LLM_PROVIDER, api_key=GEMINI_API_KEY, model_name=LLM_MODEL_NAME,
+        offline_latency=LLM_OFFLINE_LATENCY, offline_tokens_per_s=LLM_OFFLINE_TOKENS_PER_S,
+    )
+    return ResilientLLM(
+        provider, timeout=LLM_TIMEOUT, retries=LLM_RETRIES, backoff=LLM_RETRY_BACKOFF,
+        hedge_after=LLM_HEDGE_AFTER, max_workers=2 * LLM_MAX_CONCURRENCY,  # room for hedges
+    )
+
+def generate_reply(prompt: str) -> str:
+    return get_llm().generate(prompt).strip()
+
+def stream_reply(prompt: str):
+    yield from get_llm().stream(prompt)
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Flipped by warm_up() once the chat path no longer has cold-start costs
+readiness = {"emotion_model": False, "llm_client": False, "relevance_classifier": False, "errors": {}}
+
+@asynccontextmanager
+async def llm_slot():
+    """Hold one of the LLM_MAX_CONCURRENCY slots, tracked in /metrics."""
+    with LLM_WAITING.track():
+        await llm_slots.acquire()
+    try:
+        with LLM_IN_FLIGHT.track():
+            yield
+    finally:
+        llm_slots.release()
+
+async def timed(stage: str, awaitable):
+    """Await `awaitable`, recording how long it took under `stage`."""
+    with chat_latency.timer(stage):
+        return await awaitable
+
+async def check_canned_reply(user_text: str):
+    """canned_reply, off the event loop until warm_up() has trained the relevance classifier."""
+    if readiness["relevance_classifier"]:
+        return canned_reply(user_text)
+    return await run_in_threadpool(canned_reply, user_text)
+
+def warm_up():
+    for name, load in (
+        ("llm_client", lambda: get_llm().warm_up()),
+        ("relevance_classifier", load_relevance_classifier),
+        ("emotion_model", warm_up_emotion_model),
+    ):
+        try:
+            load()
+            readiness[name] = True
+        except Exception as e:
+            readiness["errors"][name] = str(e)
 
-    # 🔹 Save messages
-    db.add_all([
-        ChatMessage(session_id=session_obj.id, role="user", content=user_text, emotion=emotion),
-        ChatMessage(session_id=session_obj.id, role="bot", content=bot_reply)
-    ])
+@chat_router.post("/")
+async def chat_with_gemini(request: ChatRequest, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    user_text = request.user_message.strip()
+    if not user_text:
+        raise HTTPException(status_code=400, detail="Empty message not allowed")
 
-    # 🔹 Auto-generate title if first message
-    if not session_obj.title:
-        session_obj.title = bot_reply[:50]
-        db.add(session_obj)
+    with chat_latency.timer("total"):
+        # 🔹 Get or create chat session (from the context cache, else the DB)
+        ctx = await get_session_context(db, request.session_id, current_user['id'])
+        session_id = ctx.session_uuid
+
+        with chat_latency.timer("crisis_check"):
+            canned = await check_canned_reply(user_text)
+        if canned:
+            bot_reply, title = canned
+            with chat_latency.timer("db_commit"):
+                title = await persist_turn(db, ctx, user_text, bot_reply, None, title)
+
+            return {
+                "session_id": session_id,
+                "reply": bot_reply,
+                "title": title
+            }
+
+        # End the read transaction (if the context had to be loaded) so the
+        # pooled connection isn't held while waiting on the model and the LLM
+        await db.commit()
+
+        # 🔹 Detect emotion (batched with concurrent requests)
+        emotion = await timed("emotion", detect_emotion_async(user_text))
+
+        prompt = build_prompt(user_text, emotion, ctx.render())
+
+        # 🔹 Generate stop-safe reply
+        async with llm_slot():
+            with chat_latency.timer("llm"):
+                try:
+                    bot_reply = await run_in_threadpool(generate_reply, prompt)
+                except LLMTimeout:
+                    raise HTTPException(status_code=504, detail=LLM_TIMEOUT_DETAIL)
+                except LLMError:
+                    raise HTTPException(status_code=503, detail=LLM_UNAVAILABLE_DETAIL)
+
+        # 🔹 Save messages
+        with chat_latency.timer("db_commit"):
+            title = await persist_turn(db, ctx, user_text, bot_reply, emotion)
 
-    db.commit()
+        return {
+            "session_id": session_id,
+            "emotion": emotion,
+            "reply": bot_reply,
+            "title": title
+        }
 
-    return {
-        "session_id": session_id,
-        "emotion": emotion,
-        "reply": bot_reply,
-        "title": session_obj.title
-    }
+@chat_router.post("/stream")
+async def chat_stream(request: ChatRequest, current_user: User = Depends(get_current_user)):
+    """
+    Streaming variant of /chat/ over Server-Sent Events.
+
+    Emits a `meta` event (session id, emotion) before generation starts, one
+    `token` event per chunk from the LLM, then `done` with the session title.
+    The turn is persisted once the stream finishes or the client disconnects.
+    """
+    user_text = request.user_message.strip()
+    if not user_text:
+        raise HTTPException(status_code=400, detail="Empty message not allowed")
+
+    # The stream outlives the request's dependencies, so it owns its session
+    db = AsyncSessionLocal()
+    try:
+        ctx = await get_session_context(db, request.session_id, current_user['id'])
+        await db.commit()
+    except Exception:
+        await db.close()
+        raise
+
+    async def event_stream():
+        bot_reply, emotion, title = "", None, None
+        save_failed = False
+        started = time.perf_counter()
+        try:
+            with chat_latency.timer("crisis_check"):
+                canned = await check_canned_reply(user_text)
+            if canned:
+                bot_reply, title = canned
+                yield sse_event("meta", {"session_id": ctx.session_uuid, "emotion": None})
+                yield sse_event("token", {"text": bot_reply})
+            else:
+                emotion = await timed("emotion", detect_emotion_async(user_text))
+                yield sse_event("meta", {"session_id": ctx.session_uuid, "emotion": emotion})
+
+                prompt = build_prompt(user_text, emotion, ctx.render())
+                async with llm_slot():
+                    with chat_latency.timer("llm"):
+                        async for text in iterate_in_threadpool(stream_reply(prompt)):
+                            if not bot_reply:
+                                chat_latency.record("first_token", time.perf_counter() - started)
+                            bot_reply += text
+                            yield sse_event("token", {"text": text})
+        except LLMTimeout:
+            yield sse_event("error", {"detail": LLM_TIMEOUT_DETAIL})
+        except LLMError:
+            yield sse_event("error", {"detail": LLM_UNAVAILABLE_DETAIL})
+        except Exception:
+            logger.exception("Streamed reply for session %s failed", ctx.session_uuid)
+            yield sse_event("error", {"detail": CHAT_ERROR_DETAIL})
+        finally:
+            # Shielded so a client disconnect doesn't cancel the save
+            with anyio.CancelScope(shield=True):
+                try:
+                    if bot_reply.strip():
+                        with chat_latency.timer("db_commit"):
+                            title = await persist_turn(db, ctx, user_text, bot_reply.strip(), emotion, title)
+                except Exception:
+                    logger.exception("Saving streamed turn for session %s failed", ctx.session_uuid)
+                    save_failed = True
+                finally:
+                    await db.close()
+                    chat_latency.record("total", time.perf_counter() - started)
+
+        # Not yielded from the finally block, which also runs when the client is gone
+        if save_failed:
+            yield sse_event("error", {"detail": CHAT_ERROR_DETAIL})
+        yield sse_event("done", {"session_id": ctx.session_uuid, "title": title})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @chat_router.get("/history/{session_id}", response_model=ChatSessionOut)
-async def get_history(session_id: str, db: Session = Depends(get_db)):
-    session_obj = db.query(ChatSession).filter_by(session_uuid=session_id).first()
+async def get_history(
+    session_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[int] = None,
+    order: Literal["asc", "desc"] = "desc",
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    One page of a session's messages, keyset-paginated by message id.
+    order=desc starts at the newest message and walks back in time; pass the
+    returned next_cursor as `cursor` to load the next (older) page.
+    """
+    session_obj = await db.scalar(select(ChatSession).where(ChatSession.session_uuid == session_id))
     if not session_obj:
         raise HTTPException(status_code=404, detail="Session not found")
+    await settle(session_obj.id)
+
+    query = select(ChatMessage).where(ChatMessage.session_id == session_obj.id)
+    if order == "desc":
+        if cursor is not None:
+            query = query.where(ChatMessage.id < cursor)
+        query = query.order_by(ChatMessage.id.desc())
+    else:
+        if cursor is not None:
+            query = query.where(ChatMessage.id > cursor)
+        query = query.order_by(ChatMessage.id)
 
-    messages = db.query(ChatMessage).filter_by(session_id=session_obj.id)\
-        .order_by(ChatMessage.created_at).all()
+    # One extra row tells us whether another page exists
+    messages = (await db.scalars(query.limit(limit + 1))).all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
 
     return {
         "session_id": session_id,
-        "messages": messages
+        "messages": messages,
+        "next_cursor": messages[-1].id if has_more else None,
+        "has_more": has_more,
     }
 
 @chat_router.get("/sessions")
-async def get_sessions(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    sessions = db.query(ChatSession).filter(
-        ChatSession.user_id == current_user['id']).all()
-
-    result = []
-    for s in sessions:
-        last_msg = db.query(ChatMessage).filter_by(session_id=s.id)\
-                   .order_by(ChatMessage.created_at.desc()).first()
+async def get_sessions(db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    await settle()
+    sessions = (await db.scalars(select(ChatSession).where(
+        ChatSession.user_id == current_user['id']).order_by(ChatSession.last_message_at.desc()))).all()
 
-        result.append({
+    return [
+        {
             "session_id": s.session_uuid,
             "title": s.title or "New Conversation",
-            "last_updated": (
-                last_msg.created_at.isoformat() if last_msg else s.created_at.isoformat()
-            )
-        })
-
-    return result
+            "last_updated": (s.last_message_at or s.created_at).isoformat(),
+            "message_count": s.message_count or 0,
+        }
+        for s in sessions
+    ]
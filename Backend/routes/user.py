@@ -1,6 +1,7 @@
 from fastapi import HTTPException, Request
 from models import *
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
@@ -16,58 +17,121 @@ user_router = APIRouter(
 
 ist = pytz.timezone("Asia/Kolkata")
 
+async def lookup_login(db: AsyncSession, username: str):
+    """Snapshot the login with its role and user, then release the connection before bcrypt runs."""
+    login_obj = await get_login(username, db)
+    if not login_obj:
+        return None
+
+    user = login_obj.user
+    snapshot = {
+        "id": login_obj.id,
+        "role": login_obj.role.name,
+        "username": login_obj.username,
+        "password": login_obj.password,
+        "session_count": login_obj.session_count or 0,
+        "user_status": user.user_status if user else None,
+        "email": user.email if user else login_obj.username,
+        "first_name": user.first_name if user else "",
+        "last_name": user.last_name if user else "",
+    }
+    await db.rollback()
+    return snapshot
+
+async def record_login(db: AsyncSession, login_id: int, new_hash=None):
+    """Bump the session count and last_login (and store an upgraded hash) in one UPDATE."""
+    now = datetime.now(ist)
+    values = {Login.session_count: func.coalesce(Login.session_count, 0) + 1, Login.last_login: now}
+    if new_hash:
+        values[Login.password] = new_hash
+    await db.execute(update(Login).where(Login.id == login_id).values(values))
+    await db.commit()
+    return now
+
 @user_router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     try:
-        user = authenticate_user(form_data.username, form_data.password, db)
-        if not user:
+        # One query for the login with its role and user; bcrypt runs in the hash pool
+        account = await lookup_login(db, form_data.username)
+        verified, new_hash = (
+            await verify_and_update_async(form_data.password, account["password"])
+            if account else (False, None)
+        )
+        if not verified:
             raise HTTPException(status_code=401, detail="Incorrect username or password")
 
-        if user["user"].get("user_status") != UserStatus.active:
+        if account["user_status"] != UserStatus.active:
             raise HTTPException(
                 status_code=403,
                 detail="Your account is blocked or inactive. Please contact support."
             )
 
-        # Fetch ORM Login record
-        login_obj = db.query(Login).filter(Login.username == form_data.username).first()
-        if not login_obj:
-            raise HTTPException(status_code=404, detail="Login record not found")
-
-        # Update session count and trigger last_login update
-        ist = pytz.timezone("Asia/Kolkata")
-        now = datetime.now(ist)
-
-        login_obj.session_count = (login_obj.session_count or 0) + 1
-        login_obj.last_login = now  # ensures onupdate works properly
-        db.commit()
-        db.refresh(login_obj)
+        last_login = await record_login(db, account["id"], new_hash)
 
         # Generate token
-        access_token = create_access_token(data={"sub": user["username"]})
+        access_token = create_access_token(data={"sub": account["username"]})
 
         return {
             "access_token": access_token,
             "token_type": "bearer",
             "user": {
-                "id": user["id"],
-                "role": user["role"]["name"],
-                "username": user["username"],
-                "email": user["user"]["email"] if user.get("user") else user["username"],
-                "first_name": user["user"]["first_name"] if user.get("user") else "",
-                "last_name": user["user"]["last_name"] if user.get("user") else "",
-                "session_count": login_obj.session_count,
-                "last_login": login_obj.last_login.isoformat(),
-                "id": user["id"],
-        
+                "id": account["id"],
+                "role": account["role"],
+                "username": account["username"],
+                "email": account["email"],
+                "first_name": account["first_name"],
+                "last_name": account["last_name"],
+                "session_count": account["session_count"] + 1,
+                "last_login": last_login.isoformat(),
             }
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-    
+
+async def create_user_records(db: AsyncSession, body: dict, password_hash: str):
+    # Check if username exists
+    existing_user = await db.scalar(select(Login).where(Login.username == body.get("username")))
+    if existing_user:
+        raise HTTPException(status_code=400, detail="Username already exists")
+
+    # ✅ Create user
+    full_name = body.get("full_name", "").strip()
+    first, *last = full_name.split(" ")
+
+    new_user = User(
+        email=body.get("username"),
+        first_name=first or "",
+        last_name=" ".join(last) if last else "",
+        user_status=UserStatus.active,
+    )
+
+    db.add(new_user)
+    await db.commit()          # Commit first
+    await db.refresh(new_user) # Then refresh
+
+    # Create login
+    role = await db.scalar(select(Role).where(Role.name == body.get("role_name")))
+    if not role:
+        raise ValueError(f"Role '{body.get('role_name')}' not found.")
+
+    new_login = Login(
+        username=body.get("username"),
+        password=password_hash,
+        role_id=role.id,
+        user_id=new_user.id,
+        created_at=datetime.now(ist)
+    )
+
+    db.add(new_login)
+    await db.commit()          # Commit first
+    await db.refresh(new_login) # Then refresh
+    return new_user.to_dict()
+
 @user_router.post("/create_user")
-async def register_user(request: Request, db: Session = Depends(get_db)):
+async def register_user(request: Request, db: AsyncSession = Depends(get_db)):
     try:
         body = await request.json()
         if not body.get("username") or not body.get("password") or not body.get("role_name"):
@@ -75,77 +139,48 @@ async def register_user(request: Request, db: Session = Depends(get_db)):
 
         if body.get("role_name") != "user":
             raise HTTPException(status_code=400, detail="Invalid role name.")
-        
-        # Check if username exists
-        existing_user = db.query(Login).filter(Login.username == body.get("username")).first()
-        if existing_user:
-            raise HTTPException(status_code=400, detail="Username already exists")
-       
-        # ✅ Create user
-        full_name = body.get("full_name", "").strip()
-        first, *last = full_name.split(" ")
-
-        new_user = User(
-            email=body.get("username"),
-            first_name=first or "",
-            last_name=" ".join(last) if last else "",
-            user_status=UserStatus.active,
-        )
-
-        db.add(new_user)
-        db.commit()          # Commit first
-        db.refresh(new_user) # Then refresh
-
-        # Create login
-        role = db.query(Role).filter(Role.name == body.get("role_name")).first()
-        if not role:
-            raise ValueError(f"Role '{body.get('role_name')}' not found.")
-
-        new_login = Login(
-            username=body.get("username"),
-            password=pwd_context.hash(body.get("password")),
-            role_id=role.id,
-            user_id=new_user.id,
-            created_at=datetime.now(ist)
-        )
 
-        db.add(new_login)
-        db.commit()          # Commit first
-        db.refresh(new_login) # Then refresh
-        return {"message": "User created successfully", "user": new_user.to_dict()}
+        password_hash = await hash_password_async(body.get("password"))
+        new_user = await create_user_records(db, body, password_hash)
+        return {"message": "User created successfully", "user": new_user}
 
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @user_router.post("/change-password")
-def change_password(
+async def change_password(
     password_data: ChangePasswordRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    user = db.query(User).filter(User.id == current_user["id"]).first()
+    user = await db.scalar(select(User).where(User.id == current_user["id"]))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if not verify_password(password_data.current_password, user.password):
+    verified, _ = await verify_and_update_async(password_data.current_password, user.password)
+    if not verified:
         raise HTTPException(status_code=403, detail="Incorrect current password")
 
-    user.password = pwd_context.hash(password_data.new_password)
-    db.commit()
+    user.password = await hash_password_async(password_data.new_password)
+    await db.commit()
+    invalidate_user(current_user["username"])
 
     return {"message": "Password updated successfully"}
 
 @user_router.get("/me")
-def get_me(current_user=Depends(get_current_user)):
+async def get_me(current_user=Depends(get_current_user)):
     return current_user
 
 @user_router.put("/edit_profile")
-def edit_user(request: EditProfileRequest, 
-              db: Session = Depends(get_db), 
+async def edit_user(request: EditProfileRequest, 
+              db: AsyncSession = Depends(get_db), 
               current_user=Depends(get_current_user)):
     try:
-        user = db.query(User).filter(User.id == current_user["id"]).first()
+        user = await db.scalar(select(User).where(User.id == current_user["id"]))
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -160,8 +195,9 @@ def edit_user(request: EditProfileRequest,
         user.email = request.email
         user.phone_number = request.phone
 
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
+        invalidate_user(current_user["username"])
 
         return {
             "message": "User updated successfully",
@@ -169,26 +205,26 @@ def edit_user(request: EditProfileRequest,
         }
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @user_router.get("/support_requests")
-def get_support_requests(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+async def get_support_requests(db: AsyncSession = Depends(get_db), current_user=Depends(get_current_user)):
     try:
-        user = db.query(User).filter(User.id == current_user["id"]).first()
+        user = await db.scalar(select(User).where(User.id == current_user["id"]))
         if not user:
             raise HTTPException(status_code=404, detail="User not found")   
-        support_requests = db.query(Support_Request).filter(Support_Request.user_id == user.id).all()
+        support_requests = (await db.scalars(select(Support_Request).where(Support_Request.user_id == user.id))).all()
         return {"support_requests": [req.to_dict() for req in support_requests]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
     
 @user_router.post("/raise_query")
-def raise_query(request: CreateQuery, 
-              db: Session = Depends(get_db), 
+async def raise_query(request: CreateQuery, 
+              db: AsyncSession = Depends(get_db), 
               current_user=Depends(get_current_user)):
     try:
-        user = db.query(User).filter(User.id == current_user["id"]).first()
+        user = await db.scalar(select(User).where(User.id == current_user["id"]))
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -203,15 +239,15 @@ def raise_query(request: CreateQuery,
         )
 
         db.add(new_query)
-        db.commit()
-        db.refresh(new_query)
+        await db.commit()
+        await db.refresh(new_query)
 
         return {
             "message": "Support request created successfully",
             "support_request": new_query.to_dict()
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
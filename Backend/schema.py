@@ -29,6 +29,7 @@ class ChatRequest(ORMBase):
     user_id: Optional[int] = None  # optional if user is logged in
 
 class ChatMessageOut(ORMBase):
+    id: int
     role: str
     content: str
     emotion: Optional[str]
@@ -36,4 +37,17 @@ class ChatMessageOut(ORMBase):
 
 class ChatSessionOut(ORMBase):
     session_id: str
-    messages: List[ChatMessageOut]
\ No newline at end of file
+    messages: List[ChatMessageOut]
+    next_cursor: Optional[int] = None  # pass as `cursor` to fetch the next page
+    has_more: bool = False
+
+class BulkUserRequest(ORMBase):
+    # Users to act on: the listed ids and/or everyone matching the filters
+    # (all conditions combined); admins are never selected
+    user_ids: Optional[List[int]] = None
+    status: Optional[UserStatus] = None
+    created_before: Optional[datetime] = None
+    inactive_since: Optional[datetime] = None  # no login since then (or never)
+
+class BulkDeleteRequest(BulkUserRequest):
+    background: bool = False  # return a job id at once and delete in the background
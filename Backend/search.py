@@ -0,0 +1,120 @@
+"""
+Full-text search over chat messages using an SQLite FTS5 index.
+
+`chat_messages_fts` is an external-content table over chat_messages, so it
+stores only the index, and triggers keep it in sync with every insert,
+update and delete (ORM cascades and bulk statements included).
+
+Rebuild the index from existing messages with:
+
+    python search.py rebuild
+"""
+import re
+from sqlalchemy import DateTime, text
+
+FTS_TABLE = "chat_messages_fts"
+
+_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        content, content='chat_messages', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON chat_messages BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON chat_messages BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF content ON chat_messages BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+    END""",
+]
+
+_term_re = re.compile(r"\w+\*?")
+
+
+def search_supported(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+
+def install_search_index(bind) -> bool:
+    """Create the FTS table and triggers if missing; returns True if it was just created."""
+    if not search_supported(bind):
+        return False
+    with bind.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE},
+        ).first()
+        for statement in _SCHEMA:
+            conn.execute(text(statement))
+    return not exists
+
+
+def rebuild_search_index(bind):
+    """Re-index every message from chat_messages."""
+    with bind.begin() as conn:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def to_match_query(query: str) -> str:
+    """
+    Turn free text into an FTS5 query that matches all of its words.
+    Each word is quoted so operators and stray punctuation can't cause
+    syntax errors; a trailing * keeps prefix matching.
+    """
+    terms = []
+    for term in _term_re.findall(query):
+        prefix = term.endswith("*")
+        word = term.rstrip("*")
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+async def search_messages(db, query: str, limit: int = 20, offset: int = 0, role=None):
+    """
+    Best-ranked (bm25) messages matching `query`, with a highlighted snippet.
+    Returns (hits, total).
+    """
+    match = to_match_query(query)
+    if not match:
+        return [], 0
+
+    role_filter = "AND m.role = :role" if role else ""
+    params = {"match": match, "role": role, "limit": limit, "offset": offset}
+    from_clause = f"""
+        FROM {FTS_TABLE}
+        JOIN chat_messages m ON m.id = {FTS_TABLE}.rowid
+        JOIN chat_sessions s ON s.id = m.session_id
+        WHERE {FTS_TABLE} MATCH :match {role_filter}
+    """
+
+    total = await db.scalar(text(f"SELECT count(*) {from_clause}"), params)
+    rows = (await db.execute(text(f"""
+        SELECT m.id, m.role, m.emotion, m.created_at, s.session_uuid, s.title, s.user_id,
+               snippet({FTS_TABLE}, 0, '[', ']', '…', 12) AS snippet,
+               bm25({FTS_TABLE}) AS rank
+        {from_clause}
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    """).columns(created_at=DateTime), params)).mappings().all()
+
+    return [dict(row) for row in rows], total
+
+
+if __name__ == "__main__":
+    import argparse
+    from extensions import engine
+
+    parser = argparse.ArgumentParser(description="Manage the chat message search index")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args()
+
+    if not search_supported(engine):
+        raise SystemExit(f"Full-text search needs SQLite, not {engine.dialect.name}")
+    install_search_index(engine)
+    rebuild_search_index(engine)
+    with engine.connect() as conn:
+        count = conn.execute(text("SELECT count(*) FROM chat_messages")).scalar()
+    print(f"Rebuilt {FTS_TABLE} over {count} messages")
@@ -0,0 +1,24 @@
+import re
+
+# Words, numbers and individual punctuation marks. Subword tokenizers split
+# rare words further, so this slightly undercounts; TOKENS_PER_PIECE makes up
+# the difference for English chat text without calling the model's tokenizer.
+_piece_re = re.compile(r"\w+|[^\w\s]")
+TOKENS_PER_PIECE = 1.2
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return int(len(_piece_re.findall(text)) * TOKENS_PER_PIECE + 0.5)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` to about `max_tokens` tokens at a word boundary, marking the cut with an ellipsis."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    keep = max(1, int(max_tokens / TOKENS_PER_PIECE))
+    for i, match in enumerate(_piece_re.finditer(text)):
+        if i == keep:
+            return text[:match.start()].rstrip() + " …"
+    return text
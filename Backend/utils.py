@@ -1,31 +1,86 @@
-from transformers import pipeline
 from functools import cache
-import re
+from batcher import MicroBatcher
+from cache import TTLCache
+from inference_pool import WorkerPool
+from phrase_matcher import ReloadingPhraseMatcher
+from relevance import RelevanceClassifier, load_labelled, DATA_DIR
+from config import (
+    EMOTION_MODEL_NAME, EMOTION_BACKEND, EMOTION_ONNX_DIR,
+    EMOTION_BATCH_SIZE, EMOTION_BATCH_WAIT_MS, EMOTION_REQUEST_TIMEOUT,
+    EMOTION_CACHE_SIZE, EMOTION_CACHE_TTL, EMOTION_CACHE_MAX_CHARS,
+    EMOTION_WORKERS, EMOTION_WORKER_TIMEOUT, EMOTION_WORKER_START_TIMEOUT, EMOTION_WORKER_HEALTH_INTERVAL,
+    CRISIS_PHRASES_FILE, CRISIS_PHRASES_RELOAD_INTERVAL,
+    RELEVANCE_THRESHOLD,
+)
+import asyncio, os, threading
+
+_model_lock = threading.Lock()
+_relevance_lock = threading.Lock()
+
+def load_emotion_analyzer(backend: str = EMOTION_BACKEND):
+    # The startup warm-up and the first chat request may race to load the model
+    with _model_lock:
+        return _build_emotion_analyzer(backend)
 
 @cache
-def load_emotion_analyzer():
+def _build_emotion_analyzer(backend: str):
     """
-    Loads and caches the emotion model only once.
-    Heavy operation → solved with functools.cache.
+    Loads and caches the emotion model only once per backend.
+    Heavy operation → solved with functools.cache. transformers (and torch)
+    are imported here rather than at module level so the API starts fast.
+
+    backend: "pytorch" (full precision), "quantized" (dynamic int8 PyTorch)
+    or "onnx" (ONNX Runtime, needs `pip install optimum[onnxruntime]`).
     """
-    return pipeline(
-        "sentiment-analysis",
-        model="j-hartmann/emotion-english-distilroberta-base"
-    )
-
-CRISIS_PATTERNS = [
-    r"kill myself",
-    r"end my life",
-    r"suicid(e|al)",
-    r"self harm",
-    r"cut myself",
-    r"can't go on",
-    r"don'?t want to live",
-    r"life is meaningless",
-    r"dying",
-    r"end it all"
+    from transformers import pipeline
+
+    if backend == "pytorch":
+        return pipeline("sentiment-analysis", model=EMOTION_MODEL_NAME)
+
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(EMOTION_MODEL_NAME)
+
+    if backend == "quantized":
+        import torch
+        from transformers import AutoModelForSequenceClassification
+        model = AutoModelForSequenceClassification.from_pretrained(EMOTION_MODEL_NAME)
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+    if backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+        except ImportError as e:
+            raise RuntimeError("EMOTION_BACKEND=onnx requires `pip install optimum[onnxruntime]`") from e
+
+        # Export once, then reuse the saved graph on later startups
+        if os.path.isdir(EMOTION_ONNX_DIR):
+            model = ORTModelForSequenceClassification.from_pretrained(EMOTION_ONNX_DIR)
+        else:
+            model = ORTModelForSequenceClassification.from_pretrained(EMOTION_MODEL_NAME, export=True)
+            model.save_pretrained(EMOTION_ONNX_DIR)
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+    raise ValueError(f"Unknown emotion backend '{backend}'")
+
+# Defaults used when CRISIS_PHRASES_FILE is missing; the clinical team edits the file
+CRISIS_PHRASES = [
+    "kill myself",
+    "end my life",
+    "suicide",
+    "suicidal",
+    "self harm",
+    "cut myself",
+    "can't go on",
+    "dont want to live",
+    "don't want to live",
+    "life is meaningless",
+    "dying",
+    "end it all"
 ]
 
+crisis_matcher = ReloadingPhraseMatcher(CRISIS_PHRASES_FILE, CRISIS_PHRASES, CRISIS_PHRASES_RELOAD_INTERVAL)
+
 MILD_DISTRESS_TERMS = [
     "depressed", "anxious", "panic", "alone", "hopeless",
     "empty", "lost", "sad", "overwhelmed", "stress"
@@ -38,23 +93,99 @@ IRRELEVANT_TOPICS = [
     "game", "history", "science", "weather",
 ]
 
+def load_relevance_classifier():
+    # Like the emotion model: the warm-up and early chat requests may race to train it
+    with _relevance_lock:
+        return _train_relevance_classifier()
+
+@cache
+def _train_relevance_classifier():
+    """Trains the topic classifier from data/relevance_train.tsv once (well under a second)."""
+    texts, labels = load_labelled(os.path.join(DATA_DIR, "relevance_train.tsv"))
+    # The old keyword list doubles as extra off-topic examples
+    texts += IRRELEVANT_TOPICS
+    labels += [0] * len(IRRELEVANT_TOPICS)
+    return RelevanceClassifier.train(texts, labels, threshold=RELEVANCE_THRESHOLD)
+
+def relevance_scores(texts: list) -> list:
+    """Probability that each message is on-topic (1.0) vs. an unrelated request (0.0)."""
+    return load_relevance_classifier().scores(texts).tolist()
+
+def relevance_score(text: str) -> float:
+    return relevance_scores([text])[0]
+
 def is_irrelevant_query(text: str) -> bool:
-    t = text.lower()
-    return any(word in t for word in IRRELEVANT_TOPICS)
+    return relevance_score(text) < RELEVANCE_THRESHOLD
+
+def match_crisis_phrase(text: str):
+    """Return the crisis phrase found in the text, or None."""
+    return crisis_matcher.search(text)
 
 def detect_distress(text: str) -> bool:
-    t = text.lower()
+    # High-risk crisis phrases trigger crisis mode; mild distress → not crisis
+    return match_crisis_phrase(text) is not None
 
-    # High-risk crisis phrases
-    for pattern in CRISIS_PATTERNS:
-        if re.search(pattern, t):
-            return True  # Trigger crisis mode
+# Short, repeated utterances ("hi", "I feel anxious") skip inference entirely
+emotion_cache = TTLCache(EMOTION_CACHE_SIZE, EMOTION_CACHE_TTL)
 
-    return False  # Mild distress → not crisis
+def emotion_cache_key(text: str):
+    key = " ".join(text.lower().split())
+    return key if len(key) <= EMOTION_CACHE_MAX_CHARS else None
 
 def detect_emotion(text: str) -> str:
+    key = emotion_cache_key(text)
+    cached = emotion_cache.get(key) if key else None
+    return cached or detect_emotions([text])[0]
+
+def classify_emotions(texts: list) -> list:
+    """Run the model in the current process (also the task of pool workers)."""
+    results = load_emotion_analyzer()(texts, batch_size=len(texts), truncation=True)
+    return [r["label"].lower() for r in results]
+
+# Optional worker processes, each holding its own copy of the model
+emotion_pool = WorkerPool(
+    classify_emotions,
+    initializer=load_emotion_analyzer,
+    workers=EMOTION_WORKERS,
+    timeout=EMOTION_WORKER_TIMEOUT,
+    start_timeout=EMOTION_WORKER_START_TIMEOUT,
+    health_interval=EMOTION_WORKER_HEALTH_INTERVAL,
+) if EMOTION_WORKERS > 0 else None
+
+def detect_emotions(texts: list) -> list:
+    """Classify a batch of messages in a single forward pass."""
     try:
-        result = load_emotion_analyzer(text)
-        return result[0]["label"].lower()
+        labels = emotion_pool.run(texts) if emotion_pool else classify_emotions(texts)
     except Exception:
+        return ["neutral"] * len(texts)
+
+    for text, label in zip(texts, labels):
+        key = emotion_cache_key(text)
+        if key:
+            emotion_cache.set(key, label)
+    return labels
+
+def warm_up_emotion_model():
+    """Load the model (in-process or in the workers); raises if it can't be loaded."""
+    if emotion_pool:
+        emotion_pool.warm_up()
+        emotion_pool.run(["warm up"])
+    else:
+        classify_emotions(["warm up"])
+
+# Concurrent requests share batched forward passes
+emotion_batcher = MicroBatcher(
+    detect_emotions, EMOTION_BATCH_SIZE, EMOTION_BATCH_WAIT_MS,
+    max_concurrent_batches=max(1, EMOTION_WORKERS),
+)
+
+async def detect_emotion_async(text: str) -> str:
+    key = emotion_cache_key(text)
+    cached = emotion_cache.get(key) if key else None
+    if cached:
+        return cached
+    try:
+        # The emotion only sets the reply's tone, so a stuck batch mustn't hold the turn up
+        return await asyncio.wait_for(emotion_batcher.submit(text), EMOTION_REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
         return "neutral"
@@ -43,6 +43,11 @@ export const AdminProfile = () => {
   const [chatSessions, setChatSessions] = useState([]);
   const [chatMessages, setChatMessages] = useState([]);
   const [selectedSession, setSelectedSession] = useState(null);
+  // Chat sessions are paged and filtered on the server
+  const [sessionsPage, setSessionsPage] = useState(1);
+  const [sessionsTotal, setSessionsTotal] = useState(0);
+  const [sessionsHasMore, setSessionsHasMore] = useState(false);
+  const [sessionFilters, setSessionFilters] = useState({ hasCrisis: '', emotion: '', dateFrom: '', dateTo: '' });
 
 
   const [stats, setStats] = useState({
@@ -152,13 +157,14 @@ export const AdminProfile = () => {
 
   // Base URL for admin APIs
   const API_BASE_URL = "http://127.0.0.1:8000/api/v1/admin";
+  const SESSIONS_PAGE_SIZE = 50;
 
   useEffect(() => {
     const fetchAdminData = async () => {
       try {
         const token = localStorage.getItem("token");
 
-        const [usersRes, requestsRes, statsRes, chatSessionsRes] = await Promise.all([
+        const [usersRes, requestsRes, statsRes] = await Promise.all([
           fetch(`${API_BASE_URL}/users`, {
             headers: { Authorization: `Bearer ${token}` },
           }),
@@ -168,32 +174,22 @@ export const AdminProfile = () => {
           fetch(`${API_BASE_URL}/stats`, {
             headers: { Authorization: `Bearer ${token}` },
           }),
-          fetch(`${API_BASE_URL}/chat/sessions`, {
-            headers: { Authorization: `Bearer ${token}` },
-          }),
-
         ]);
 
 
-        if (!usersRes.ok || !requestsRes.ok || !chatSessionsRes.ok) {
+        if (!usersRes.ok || !requestsRes.ok) {
           throw new Error("Failed to fetch admin data");
         }
 
-        const [usersData, requestsData, statsData, chatReqData] = await Promise.all([
+        const [usersData, requestsData, statsData] = await Promise.all([
           usersRes.json(),
           requestsRes.json(),
           statsRes.json(),
-          chatSessionsRes.json(),
         ]);
 
         setAllUsers(usersData);
         setSupportRequests(requestsData);
         setStats(statsData);
-        setChatSessions(
-          Array.isArray(chatReqData)
-            ? chatReqData
-            : chatReqData.sessions || []
-        );
       } catch (err) {
         console.error("Error fetching admin data:", err);
       } finally {
@@ -203,6 +199,38 @@ export const AdminProfile = () => {
     fetchAdminData();
   }, []);
 
+  useEffect(() => {
+    const fetchSessions = async () => {
+      const token = localStorage.getItem("token");
+      const params = new URLSearchParams({ page: String(sessionsPage), page_size: String(SESSIONS_PAGE_SIZE) });
+      if (sessionFilters.hasCrisis) params.set("has_crisis", sessionFilters.hasCrisis);
+      if (sessionFilters.emotion) params.set("emotion", sessionFilters.emotion);
+      if (sessionFilters.dateFrom) params.set("date_from", sessionFilters.dateFrom);
+      if (sessionFilters.dateTo) params.set("date_to", `${sessionFilters.dateTo}T23:59:59`);
+
+      try {
+        const res = await fetch(`${API_BASE_URL}/chat/sessions?${params}`, {
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        if (!res.ok) {
+          throw new Error("Failed to fetch chat sessions");
+        }
+        const data = await res.json();
+        setChatSessions(data.sessions);
+        setSessionsTotal(data.total);
+        setSessionsHasMore(data.has_more);
+      } catch (err) {
+        console.error("Error fetching chat sessions:", err);
+      }
+    };
+    fetchSessions();
+  }, [sessionsPage, sessionFilters]);
+
+  const updateSessionFilter = (name: string, value: string) => {
+    setSessionFilters(prev => ({ ...prev, [name]: value }));
+    setSessionsPage(1);
+  };
+
   const fetchMessages = async (sessionId) => {
   const token = localStorage.getItem("token");
   setSelectedSession(sessionId);
@@ -611,7 +639,43 @@ export const AdminProfile = () => {
 
                   {/* SESSIONS LIST */}
                   <div className="border rounded-lg p-3 bg-white h-[600px] overflow-auto">
-                    <h3 className="text-teal-900 mb-3 font-medium">User Sessions</h3>
+                    <h3 className="text-teal-900 mb-3 font-medium">User Sessions ({sessionsTotal})</h3>
+
+                    <div className="grid grid-cols-2 gap-2 mb-3">
+                      <select
+                        value={sessionFilters.hasCrisis}
+                        onChange={(e) => updateSessionFilter("hasCrisis", e.target.value)}
+                        className="border border-teal-200 rounded-md px-2 py-1 text-sm text-teal-900"
+                      >
+                        <option value="">All sessions</option>
+                        <option value="true">Crisis only</option>
+                        <option value="false">No crisis</option>
+                      </select>
+                      <select
+                        value={sessionFilters.emotion}
+                        onChange={(e) => updateSessionFilter("emotion", e.target.value)}
+                        className="border border-teal-200 rounded-md px-2 py-1 text-sm text-teal-900"
+                      >
+                        <option value="">Any emotion</option>
+                        {["joy", "sadness", "anger", "fear", "surprise", "disgust", "neutral"].map((emotion) => (
+                          <option key={emotion} value={emotion}>{emotion}</option>
+                        ))}
+                      </select>
+                      <Input
+                        type="date"
+                        value={sessionFilters.dateFrom}
+                        onChange={(e) => updateSessionFilter("dateFrom", e.target.value)}
+                        className="border-teal-200 text-sm"
+                        title="Active from"
+                      />
+                      <Input
+                        type="date"
+                        value={sessionFilters.dateTo}
+                        onChange={(e) => updateSessionFilter("dateTo", e.target.value)}
+                        className="border-teal-200 text-sm"
+                        title="Active until"
+                      />
+                    </div>
 
                     {chatSessions.map((s) => (
                       <div
@@ -629,6 +693,28 @@ export const AdminProfile = () => {
                         </p>
                       </div>
                     ))}
+
+                    <div className="flex items-center justify-between mt-3">
+                      <Button
+                        variant="outline"
+                        size="sm"
+                        disabled={sessionsPage === 1}
+                        onClick={() => setSessionsPage(sessionsPage - 1)}
+                      >
+                        Previous
+                      </Button>
+                      <span className="text-xs text-teal-600">
+                        Page {sessionsPage} of {Math.max(1, Math.ceil(sessionsTotal / SESSIONS_PAGE_SIZE))}
+                      </span>
+                      <Button
+                        variant="outline"
+                        size="sm"
+                        disabled={!sessionsHasMore}
+                        onClick={() => setSessionsPage(sessionsPage + 1)}
+                      >
+                        Next
+                      </Button>
+                    </div>
                   </div>
 
                   {/* CHAT MESSAGES VIEW */}
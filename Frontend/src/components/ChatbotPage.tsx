@@ -32,6 +32,8 @@ interface ChatSession {
   messages: Message[];
   lastUpdated: string;
   isTemporary?: boolean;
+  olderCursor?: number | null; // next_cursor of the oldest history page loaded
+  hasOlder?: boolean;
 }
 
 interface ChatbotPageProps {
@@ -44,6 +46,7 @@ export const ChatbotPage = ({ onNavigateToProfile }: ChatbotPageProps) => {
   const [isTyping, setIsTyping] = useState(false);
   const [sidebarOpen, setSidebarOpen] = useState(true);
   const [loadingSessions, setLoadingSessions] = useState(true);
+  const [loadingOlder, setLoadingOlder] = useState(false);
 
   const API_URL = "http://127.0.0.1:8000/chat";
 
@@ -116,12 +119,14 @@ export const ChatbotPage = ({ onNavigateToProfile }: ChatbotPageProps) => {
     loadSessions();
   }, []);
 
-  const loadChatHistory = async (sessionId: string) => {
+  const loadChatHistory = async (sessionId: string, cursor?: number) => {
     try {
-      const res = await fetch(`${API_URL}/history/${sessionId}`);
+      const query = cursor !== undefined ? `?cursor=${cursor}` : "";
+      const res = await fetch(`${API_URL}/history/${sessionId}${query}`);
       const data = await res.json();
 
-      const msgs = data.messages.map((m: any) => ({
+      // History pages come newest-first; display them oldest-first
+      const msgs = [...data.messages].reverse().map((m: any) => ({
         id: String(m.id),
         content: m.content,
         sender: m.role === 'user' ? 'user' : 'bot',
@@ -131,7 +136,15 @@ export const ChatbotPage = ({ onNavigateToProfile }: ChatbotPageProps) => {
 
       setChatSessions(prev =>
         prev.map(s =>
-          s.id === sessionId ? { ...s, messages: msgs } : s
+          s.id === sessionId
+            ? {
+              ...s,
+              // An older page goes above the messages already shown
+              messages: cursor !== undefined ? [...msgs, ...s.messages] : msgs,
+              olderCursor: data.next_cursor,
+              hasOlder: data.has_more
+            }
+            : s
         )
       );
     } catch (err) {
@@ -139,6 +152,17 @@ export const ChatbotPage = ({ onNavigateToProfile }: ChatbotPageProps) => {
     }
   };
 
+  const loadOlderMessages = async () => {
+    if (!activeSession?.hasOlder || activeSession.olderCursor == null) return;
+
+    setLoadingOlder(true);
+    try {
+      await loadChatHistory(activeSession.id, activeSession.olderCursor);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   useEffect(() => {
     if (!activeSessionId) return;
 
@@ -342,6 +366,19 @@ export const ChatbotPage = ({ onNavigateToProfile }: ChatbotPageProps) => {
         <ScrollArea className="flex-1 px-4 py-6">
           <div className="max-w-4xl mx-auto space-y-4">
 
+            {activeSession?.hasOlder && (
+              <div className="flex justify-center">
+                <Button
+                  variant="ghost"
+                  onClick={loadOlderMessages}
+                  disabled={loadingOlder}
+                  className="text-teal-600"
+                >
+                  {loadingOlder ? "Loading..." : "Load older messages"}
+                </Button>
+              </div>
+            )}
+
             {messages.map(msg => (
               <div key={msg.id} className={`flex gap-3 ${msg.sender === 'user' ? 'flex-row-reverse' : ''}`}>
                 <Avatar className={msg.sender === 'user' ? 'bg-teal-500' : 'bg-cyan-500'}>